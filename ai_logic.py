@@ -1,14 +1,129 @@
-import numpy as np
-import logic
-import constants as c
-import copy
+import math
+import random
+import time
+import bitboard
+import symmetry
+from transposition import TranspositionTable
+from search_stats import SearchStats
+
+SEARCH_ALGORITHMS = ('minimax', 'expectimax')
+
+# share of minimax spawn nodes alpha-beta leaves to search, for estimate_nodes
+MINIMAX_SPAWN_FRACTION = 0.34
+
+
+class SearchCancelled(Exception):
+    """Raised inside the search when its should_stop callback returns True."""
+
+
+def make_evaluator(evaluator):
+    """
+    Leaf evaluator for GameAI: None for the hand-weighted heuristic, a path
+    to n-tuple network weights (memory-mapped), or any object with
+    evaluate(board) and evaluate_many(boards) on bitboards.
+    """
+    # the evaluator modules load tables (and ntuple numpy), so they are only
+    # imported once one is built
+    if evaluator is None:
+        from heuristics import HeuristicEvaluator
+        return HeuristicEvaluator()
+    if isinstance(evaluator, str):
+        from ntuple import NTupleNetwork
+        return NTupleNetwork.load(evaluator)
+    return evaluator
+
 
 class GameAI:
-    def __init__(self, search_depth=3):
+    def __init__(self, search_depth=None, algorithm='minimax', min_probability=0.0001,
+                 tt_size=2 ** 18, tt_policy='depth', time_budget_ms=None, max_depth=10,
+                 parallel_workers=0, parallel_chance=False, stats=None,
+                 evaluator=None, depth_reduction=0, tt_symmetry=None, book=None,
+                 node_budget=None):
+        if algorithm not in SEARCH_ALGORITHMS:
+            raise ValueError(f"unknown search algorithm: {algorithm!r}")
+        # everything a worker process needs to rebuild an equivalent searcher
+        self.options = {
+            'search_depth': search_depth,
+            'algorithm': algorithm,
+            'min_probability': min_probability,
+            'tt_size': tt_size,
+            'tt_policy': tt_policy,
+            'evaluator': evaluator,
+            'depth_reduction': depth_reduction,
+            'tt_symmetry': tt_symmetry,
+            'book': book,
+            'node_budget': node_budget,
+        }
+        # fixed search depth, None picks it from the empty cells (fixed_depth)
         self.search_depth = search_depth
+        self.algorithm = algorithm
+        # expectimax stops expanding branches less likely than this
+        self.min_probability = min_probability
+        # chance-node cache shared by every get_best_move call of this AI, None disables it
+        self.transposition_table = TranspositionTable(tt_size, tt_policy) if tt_size else None
+        # scores every leaf of the search (see make_evaluator); pass weights as a
+        # path rather than an object when using parallel_workers
+        self.evaluator = make_evaluator(evaluator)
+        # a stronger evaluator can search shallower: taken off the fixed depth (minimum 1)
+        self.depth_reduction = depth_reduction
+        # store chance nodes under their canonical symmetric board (see symmetry.py), so
+        # rotations and reflections share entries; only exact for symmetric evaluators
+        if tt_symmetry is None:
+            tt_symmetry = getattr(self.evaluator, 'symmetric', False)
+        self.tt_symmetry = tt_symmetry
+        # opening book file (see opening_book.py) answered before any search
+        self.book = None
+        if book is not None:
+            from opening_book import OpeningBook
+            self.book = OpeningBook(book)
+        # anytime mode: deepen until time_budget_ms is spent (capped at max_depth)
+        self.time_budget_ms = time_budget_ms
+        self.max_depth = max_depth
+        # search root moves concurrently in a persistent process pool (see parallel_search.py);
+        # parallel_chance also splits the first chance layer of expectimax into tasks
+        self.parallel_workers = parallel_workers
+        self.parallel_chance = parallel_chance
+        # adaptive depth: search as deep as the estimated node count allows
+        # (see choose_depth), instead of the fixed depth by empty cells
+        self.node_budget = node_budget
+        # measured / estimated nodes of past adaptive searches, smoothed in log space
+        self.cost_scale = 1.0
+        # best move of the previous get_best_move call, tried first next time
+        self._previous_best = None
+        # depth of the last completed search, reported by get_best_move
+        self.last_search_depth = 0
+        # optional search_stats.SearchStats, None keeps the search uninstrumented
+        self.stats = stats
+        # should_stop callback of the running get_best_move call
+        self._should_stop = None
+    
+    def new_game(self):
+        # forget the previous game's cached scores, move ordering and node
+        # estimates, so a game plays the same whichever games this AI ran before
+        if self.transposition_table is not None:
+            self.transposition_table.clear()
+        self._previous_best = None
+        self.cost_scale = 1.0
+
+    def evaluate_bitboard(self, board):
+        if self.stats is not None:
+            self.stats.evaluated()
+        return self.evaluator.evaluate(board)
+    
+    def evaluate_boards(self, boards):
+        # score many leaf bitboards at once, returns a NumPy array
+        if self.stats is not None:
+            self.stats.evaluated(len(boards))
+        return self.evaluator.evaluate_many(boards)
     
     def evaluate_board(self, matrix):
+        if len(matrix) == 4 and len(matrix[0]) == 4:
+            return self.evaluate_bitboard(bitboard.from_matrix(matrix))
+        return self.evaluate_matrix(matrix)
 
+    def evaluate_matrix(self, matrix):
+        # the heuristic on a list-of-lists board of any size, the evaluator
+        # tables reproduce it for 4x4
         total_score = sum(sum(row) for row in matrix)
         
         empty_cells = sum(row.count(0) for row in matrix)               
@@ -41,11 +156,11 @@ class GameAI:
                 if matrix[i][j] != 0:
                     # horizontal smoothness
                     if j < len(matrix[0]) - 1 and matrix[i][j+1] != 0:
-                        smoothness -= abs(np.log2(matrix[i][j]) - np.log2(matrix[i][j+1]))
+                        smoothness -= abs(math.log2(matrix[i][j]) - math.log2(matrix[i][j+1]))
                     
                     # vertical smoothness
                     if i < len(matrix) - 1 and matrix[i+1][j] != 0:
-                        smoothness -= abs(np.log2(matrix[i][j]) - np.log2(matrix[i+1][j]))
+                        smoothness -= abs(math.log2(matrix[i][j]) - math.log2(matrix[i+1][j]))
         return smoothness
     
     def calculate_monotonicity(self, matrix):
@@ -72,9 +187,18 @@ class GameAI:
         
         return monotonicity
     
-    def minimax_with_alpha_beta(self, matrix, depth, alpha, beta, is_maximizing):
+    def minimax_with_alpha_beta(self, board, depth, alpha, beta, is_maximizing, rng=None,
+                                bound=float('-inf')):
+        # board is a bitboard (see bitboard.py), rng supplies the sampled spawns;
+        # bound only lets this node give up early (see score_move), it is not
+        # passed on, so the children are searched exactly as without it
+        if self._should_stop is not None and self._should_stop():
+            raise SearchCancelled()
+        stats = self.stats
+        if stats is not None:
+            stats.node(depth)
         # Check game state
-        game_state = logic.game_state(matrix)
+        game_state = bitboard.game_state(board)
         if game_state == 'win':
             return float('inf')
         if game_state == 'lose':
@@ -82,58 +206,51 @@ class GameAI:
         
         # Reached search depth
         if depth == 0:
-            return self.evaluate_board(matrix)
+            return self.evaluate_bitboard(board)
         
         # Maximizer (AI's turn)
         if is_maximizing:
             max_eval = float('-inf')
-            moves = [
-                ('up', logic.up),
-                ('down', logic.down),
-                ('left', logic.left),
-                ('right', logic.right)
-            ]
+            children = 0
             
-            for move_name, move_func in moves:
-                new_matrix, done = move_func(copy.deepcopy(matrix))
+            # legal moves only, biggest merges first so pruning kicks in sooner
+            afterstates = [a for a in bitboard.afterstates(board) if a.legal]
+            afterstates.sort(key=lambda a: a.score, reverse=True)
+            for afterstate in afterstates:
+                children += 1
+                new_board = bitboard.add_random_tile(afterstate.board, rng)
                 
-                if done:
-                    new_matrix = logic.add_random_tile(new_matrix)
-                    
-                    # Recursively evaluate
-                    eval_score = self.minimax_with_alpha_beta(
-                        new_matrix, depth - 1, alpha, beta, False
-                    )
-                    
-                    max_eval = max(max_eval, eval_score)
-                    alpha = max(alpha, eval_score)
-                    
-                    # Pruning
-                    if beta <= alpha:
-                        break
+                # Recursively evaluate
+                eval_score = self.minimax_with_alpha_beta(
+                    new_board, depth - 1, alpha, beta, False, rng
+                )
+                
+                max_eval = max(max_eval, eval_score)
+                alpha = max(alpha, eval_score)
+                
+                # Pruning
+                if beta <= alpha:
+                    break
             
+            if stats is not None:
+                stats.expand(children)
             return max_eval
         
         # Minimizer (random tile placement)
         else:
             min_eval = float('inf')
-            empty_tiles = [
-                (i, j) for i in range(len(matrix)) for j in range(len(matrix[0])) if matrix[i][j] == 0
-            ]
+            children = 0
             
-            for i, j in empty_tiles:
+            for k in bitboard.empty_positions(board):
+                children += 2
                 # Try placing 2 (90% probability)
-                new_matrix_2 = copy.deepcopy(matrix)
-                new_matrix_2[i][j] = 2
                 eval_score_2 = self.minimax_with_alpha_beta(
-                    new_matrix_2, depth - 1, alpha, beta, True
+                    board | (1 << (4 * k)), depth - 1, alpha, beta, True, rng
                 )
                 
                 # Try placing 4 (10% probability)
-                new_matrix_4 = copy.deepcopy(matrix)
-                new_matrix_4[i][j] = 4
                 eval_score_4 = self.minimax_with_alpha_beta(
-                    new_matrix_4, depth - 1, alpha, beta, True
+                    board | (2 << (4 * k)), depth - 1, alpha, beta, True, rng
                 )
                 
                 # Weighted average
@@ -143,50 +260,370 @@ class GameAI:
                 beta = min(beta, eval_score)
                 
                 # Pruning
-                if beta <= alpha:
+                if beta <= alpha or beta < bound:
                     break
             
+            if stats is not None:
+                stats.expand(children)
             return min_eval
 
 
+    def expectimax_max(self, board, depth, probability):
+        # AI's turn: take the best move, a board with no legal move is lost
+        if self._should_stop is not None and self._should_stop():
+            raise SearchCancelled()
+        stats = self.stats
+        if stats is not None:
+            stats.node(depth)
+        if bitboard.is_win(board):
+            return float('inf')
+        if depth == 0:
+            return self.evaluate_bitboard(board)
+        
+        best_score = float('-inf')
+        children = 0
+        for move_name, new_board in bitboard.legal_moves(board):
+            children += 1
+            best_score = max(
+                best_score,
+                self.expectimax_chance(new_board, depth - 1, probability)
+            )
+        if stats is not None:
+            stats.expand(children)
+        return best_score
+
+    def expectimax_chance(self, board, depth, probability):
+        # tile spawn: probability-weighted average over every empty cell and both tiles
+        stats = self.stats
+        if stats is not None:
+            stats.node(depth)
+        if bitboard.is_win(board):
+            return float('inf')
+        if depth == 0 or probability < self.min_probability:
+            # a static evaluation is as good as a depth 0 search
+            depth = 0
+        
+        table = self.transposition_table
+        if table is not None:
+            key = symmetry.canonical(board) if self.tt_symmetry else board
+            cached = table.get(key, depth)
+            if cached is not None:
+                return cached
+        
+        if depth == 0:
+            score = self.evaluate_bitboard(board)
+            if table is not None:
+                table.put(key, depth, score)
+            return score
+        
+        empty_tiles = bitboard.empty_positions(board)
+        if stats is not None:
+            stats.expand(2 * len(empty_tiles))
+        if depth == 1:
+            # every spawn leads straight to a leaf, score them in one batch
+            spawns = [board | (1 << (4 * k)) for k in empty_tiles]
+            spawns += [board | (2 << (4 * k)) for k in empty_tiles]
+            if stats is not None:
+                stats.node(0, len(spawns))
+            scores = self.evaluate_boards(spawns)
+            n = len(empty_tiles)
+            score = (0.9 * scores[:n].sum() + 0.1 * scores[n:].sum()) / n
+            if table is not None:
+                table.put(key, depth, score)
+            return score
+        
+        cell_probability = probability / len(empty_tiles)
+        total = 0.0
+        for k in empty_tiles:
+            # 90% chance of a 2, 10% chance of a 4
+            total += 0.9 * self.expectimax_max(
+                board | (1 << (4 * k)), depth - 1, cell_probability * 0.9
+            )
+            total += 0.1 * self.expectimax_max(
+                board | (2 << (4 * k)), depth - 1, cell_probability * 0.1
+            )
+        score = total / len(empty_tiles)
+        if table is not None:
+            table.put(key, depth, score)
+        return score
+
+
+    def get_cache_stats(self):
+        # hit/miss/eviction counters of the transposition table, None when disabled
+        if self.transposition_table is None:
+            return None
+        return self.transposition_table.stats()
+
+
     def get_num_empty_tiles(self, matrix):
         return sum(row.count(0) for row in matrix)
 
     
-    def get_best_move(self, matrix):
+    def get_best_move(self, matrix, rng=None, should_stop=None):
+        # rng: random.Random-like source for the spawns minimax samples
+        # should_stop: polled during the search, raises SearchCancelled once it returns True
+        self._should_stop = should_stop
+        stats = self.stats
+        if stats is None:
+            try:
+                return self._search_best_move(matrix, rng)
+            finally:
+                self._should_stop = None
+        
+        table = self.transposition_table
+        hits, misses = (table.hits, table.misses) if table is not None else (0, 0)
+        start = time.perf_counter()
+        try:
+            return self._search_best_move(matrix, rng)
+        finally:
+            self._should_stop = None
+            if table is not None:
+                hits, misses = table.hits - hits, table.misses - misses
+            stats.record_call(time.perf_counter() - start, self.last_search_depth, hits, misses)
 
-        moves = [
-            ('up', logic.up),
-            ('down', logic.down),
-            ('left', logic.left),
-            ('right', logic.right)
-        ]
+    def _search_best_move(self, matrix, rng):
+        # search runs on the packed bitboard, the matrix is only converted once
+        if isinstance(matrix, bitboard.Board):
+            board = matrix.bits
+        else:
+            board = bitboard.from_matrix(matrix)
+        if self.book is not None:
+            best_move = self.book.lookup(board)
+            if best_move is not None:
+                self.last_search_depth = 0
+                return best_move
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
         
-        best_move = None
-        best_score = float('-inf')
+        if self.time_budget_ms is not None:
+            best_move = self.iterative_deepening(board, rng)
+            self._previous_best = best_move
+            return best_move
         
-        for move_name, move_func in moves:
-            
-            new_matrix, done = move_func(copy.deepcopy(matrix))
-            
-            empty_tiles = self.get_num_empty_tiles(matrix)
-            if empty_tiles > 6:
-                depth = 4
-            elif empty_tiles > 3:
-                depth = 3
-            else:
-                depth = 2
+        if self._root_prunes():
+            moves = self.order_moves(board)
+        else:
+            moves = bitboard.MOVES
+        if self.node_budget is not None:
+            best_move, depth = self._adaptive_search(board, rng, moves)
+        else:
+            depth = max(1, self.fixed_depth(board) - self.depth_reduction)
+            best_move, _ = self.search_root(board, depth, rng, moves)
+        self.last_search_depth = depth
+        self._previous_best = best_move
+        return best_move
 
-            if done:
-                # Score this move
-                new_matrix = logic.add_random_tile(new_matrix)
-                move_score = self.minimax_with_alpha_beta(
-                    new_matrix, depth, float('-inf'), float('inf'), False
+    def _root_prunes(self):
+        # only the serial minimax root prunes with the move order (see search_root)
+        return self.algorithm == 'minimax' and not self.parallel_workers
+
+    def fixed_depth(self, board):
+        # search_depth if set, else deeper while the board is open
+        if self.search_depth is not None:
+            return self.search_depth
+        empty_tiles = bitboard.count_empty(board)
+        if empty_tiles > 6:
+            return 4
+        elif empty_tiles > 3:
+            return 3
+        return 2
+
+    def order_moves(self, board):
+        """
+        Root moves best-first: the previous turn's best move, then by merge
+        score plus static evaluation of the board the move leaves. Illegal
+        moves go last. The serial minimax root discards a move as soon as
+        it falls below the best score so far (see score_move), so a good
+        first move prunes more. The order never changes the chosen move.
+        """
+        keys = {}
+        for afterstate in bitboard.afterstates(board):
+            if not afterstate.legal:
+                keys[afterstate.move] = (0, 0.0)
+            elif afterstate.move == self._previous_best:
+                keys[afterstate.move] = (2, 0.0)
+            else:
+                keys[afterstate.move] = (
+                    1, afterstate.score + self.evaluator.evaluate(afterstate.board)
                 )
-                
-                # Update best move
-                if move_score > best_score:
-                    best_score = move_score
+        return sorted(bitboard.MOVES, key=lambda move: keys[move[0]], reverse=True)
+
+    def estimate_nodes(self, board, depth):
+        """
+        Rough size of a depth-deep search from board, before calibration.
+
+        Chance layers branch on two tiles per empty cell and move layers on
+        the legal moves. Each ply fills one cell. Equal tiles (filled cells
+        minus distinct tile values) are expected to merge and free cells
+        again. Expectimax stops expanding below min_probability, so deeper
+        layers only count while the path probability stays above it, and
+        minimax only searches the share of spawns alpha-beta leaves.
+        """
+        empty = bitboard.count_empty(board)
+        exponents = {(board >> (4 * k)) & 0xF for k in range(16)}
+        distinct = len(exponents - {0})
+        merges_per_ply = min(1.0, (16 - empty - distinct) / 4)
+        moves = min(4.0, 2.0 + empty / 4)
+        
+        width = float(len(bitboard.legal_moves(board)))
+        probability = 1.0
+        cells = empty + merges_per_ply
+        nodes = 0.0
+        for layer in range(depth + 1):
+            nodes += width
+            if layer == depth:
+                break
+            if layer % 2 == 0:
+                # chance layer
+                cells = max(1.0, cells)
+                if self.algorithm == 'expectimax' and probability < self.min_probability:
+                    break
+                probability *= 0.9 / cells
+                width *= 2 * cells
+                if self.algorithm == 'minimax':
+                    # alpha-beta cuts off most spawns, measured on self-play positions
+                    width *= MINIMAX_SPAWN_FRACTION
+                cells += merges_per_ply - 1
+            else:
+                width *= moves
+        return nodes
+
+    def choose_depth(self, board):
+        """
+        Deepest search whose calibrated node estimate fits node_budget, at
+        least 1. Expectimax may go up to max_depth. Minimax never goes past
+        fixed_depth: its worst-case spawns make deeper searches play worse.
+        """
+        limit = self.max_depth if self.algorithm == 'expectimax' else self.fixed_depth(board)
+        depth = 1
+        for candidate in range(2, limit + 1):
+            if self.cost_scale * self.estimate_nodes(board, candidate) > self.node_budget:
+                break
+            depth = candidate
+        return max(1, depth - self.depth_reduction)
+
+    def _adaptive_search(self, board, rng, moves):
+        # count the nodes actually searched to calibrate the next estimates
+        stats = self.stats
+        counter = stats if stats is not None else SearchStats()
+        before = counter.nodes
+        depth = self.choose_depth(board)
+        self.stats = counter
+        try:
+            best_move, _ = self.search_root(board, depth, rng, moves)
+        finally:
+            self.stats = stats
+        measured = counter.nodes - before
+        estimated = self.estimate_nodes(board, depth)
+        if measured and estimated and not self.parallel_workers:
+            ratio = math.log(measured / estimated)
+            self.cost_scale = math.exp(0.8 * math.log(self.cost_scale) + 0.2 * ratio)
+        return best_move, depth
+
+    def root_move_seeds(self, legal, rng):
+        """
+        {move: spawn seed} for the legal root moves. Minimax gives each move
+        its own spawn stream, drawn in the fixed bitboard.MOVES order, so
+        neither the search order nor a parallel search changes the spawns a
+        move is scored on. Expectimax samples nothing and gets None seeds.
+        """
+        if self.algorithm == 'expectimax':
+            return dict.fromkeys(legal)
+        rng = rng or random
+        return {
+            move_name: rng.getrandbits(64)
+            for move_name, _ in bitboard.MOVES if move_name in legal
+        }
+
+    def score_move(self, new_board, depth, seed=None, bound=float('-inf')):
+        """
+        Score the board left by a root move. With minimax, the spawn layer
+        under the move stops as soon as its running minimum drops below
+        bound, and the move is then only known to score below bound. A score
+        at or above bound is the same as a search without it: the bound
+        never reaches the nodes below, so they see the same window and draw
+        the same spawns.
+        """
+        if self.algorithm == 'expectimax':
+            return self.expectimax_chance(new_board, depth, 1.0)
+        move_rng = random.Random(seed)
+        new_board = bitboard.add_random_tile(new_board, move_rng)
+        return self.minimax_with_alpha_beta(
+            new_board, depth, float('-inf'), float('inf'), False, move_rng, bound
+        )
+
+    def search_root(self, board, depth, rng=None, moves=bitboard.MOVES):
+        """
+        Score every legal root move, searching them in the given order, and
+        return (best_move, {move: score}). Serially, every move after the
+        first is searched with the best score so far as bound, so a move
+        that cannot win is discarded early and its score is an upper bound.
+        The best move is picked in the fixed bitboard.MOVES order (the first
+        of equal scores), so it does not depend on the search order and
+        matches a parallel search.
+        """
+        if self.parallel_workers:
+            import parallel_search
+            scores = parallel_search.score_root_moves(self, board, depth, rng, moves)
+        else:
+            scores = {}
+            legal = dict(bitboard.legal_moves(board))
+            seeds = self.root_move_seeds(legal, rng)
+            bound = float('-inf')
+            for move_name, move_func in moves:
+                if move_name in legal:
+                    scores[move_name] = self.score_move(
+                        legal[move_name], depth, seeds[move_name], bound
+                    )
+                    bound = max(bound, scores[move_name])
+        
+        best_move = None
+        best_score = float('-inf')
+        for move_name, move_func in bitboard.MOVES:
+            if move_name in scores:
+                # Update best move, a legal move is kept even if every move loses
+                if best_move is None or scores[move_name] > best_score:
+                    best_score = scores[move_name]
                     best_move = move_name
         
-        return best_move
\ No newline at end of file
+        return best_move, scores
+
+    def iterative_deepening(self, board, rng=None):
+        """
+        Search depth 1, 2, 3, ... until time_budget_ms runs out and return the
+        best move of the deepest iteration that finished. With serial minimax
+        each iteration tries the root moves best-first according to the
+        previous one, so the root bound discards the weaker moves sooner (a
+        discarded move's score is only an upper bound, which is still good
+        enough to order by).
+        """
+        deadline = time.perf_counter() + self.time_budget_ms / 1000
+        caller_stop = self._should_stop
+        
+        # depth 1 always completes so there is a move to return
+        moves = list(bitboard.MOVES)
+        best_move, scores = self.search_root(board, 1, rng, moves)
+        self.last_search_depth = 1
+        
+        def should_stop():
+            if caller_stop is not None and caller_stop():
+                return True
+            return time.perf_counter() >= deadline
+        
+        self._should_stop = should_stop
+        try:
+            for depth in range(2, self.max_depth + 1):
+                if time.perf_counter() >= deadline:
+                    break
+                if self._root_prunes():
+                    moves.sort(key=lambda move: scores.get(move[0], float('-inf')), reverse=True)
+                try:
+                    best_move, scores = self.search_root(board, depth, rng, moves)
+                except SearchCancelled:
+                    if caller_stop is not None and caller_stop():
+                        raise
+                    break
+                self.last_search_depth = depth
+        finally:
+            self._should_stop = caller_stop
+        return best_move
@@ -0,0 +1,77 @@
+"""
+Runs GameAI searches on a background thread for the Tkinter UI.
+
+The UI submits a board and keeps handling events. It polls for the answer
+from the Tk loop with after(). Submitting a new board or calling cancel()
+makes any running search stale: the worker aborts it at the next search
+node and its result is never delivered. A search that fails is reported
+as no move.
+"""
+import queue
+import threading
+import traceback
+
+from ai_logic import SearchCancelled
+
+
+class BackgroundSearch:
+    def __init__(self, ai):
+        self.ai = ai
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, matrix):
+        """Start searching matrix, cancelling any older search. Returns its ticket."""
+        with self._lock:
+            self._generation += 1
+            ticket = self._generation
+        # copy the rows, the UI keeps mutating its matrix
+        self._requests.put((ticket, [row[:] for row in matrix]))
+        return ticket
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+
+    def is_current(self, ticket):
+        return ticket == self._generation
+
+    def poll(self):
+        """Return (ticket, best_move) of the current search if it finished, else None."""
+        result = None
+        while True:
+            try:
+                ticket, best_move = self._results.get_nowait()
+            except queue.Empty:
+                return result
+            if self.is_current(ticket):
+                result = (ticket, best_move)
+
+    def close(self):
+        self.cancel()
+        self._requests.put(None)
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            ticket, matrix = request
+            if not self.is_current(ticket):
+                continue
+            try:
+                best_move = self.ai.get_best_move(
+                    matrix, should_stop=lambda: not self.is_current(ticket)
+                )
+            except SearchCancelled:
+                continue
+            except Exception:
+                # keep the thread alive and answer with no move, so the UI
+                # clears its label and stops autoplay instead of waiting forever
+                traceback.print_exc()
+                best_move = None
+            self._results.put((ticket, best_move))
@@ -0,0 +1,441 @@
+"""
+Performance benchmarks for the game logic and AI hot paths.
+
+Every benchmark runs on a fixed corpus of early, mid and late game positions
+and reports ops/second, search nodes/second and per-move latency percentiles.
+Results can be written as JSON and two JSON files can be compared to catch
+regressions between commits:
+
+    $ python3 benchmark.py --output before.json
+    $ python3 benchmark.py --output after.json
+    $ python3 benchmark.py --compare before.json after.json
+
+--legacy compares the bitboard minimax against the original list-of-lists
+search (copy.deepcopy at every node).
+"""
+import argparse
+import copy
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+
+import logic
+from ai_logic import GameAI
+
+# fixed positions taken from an expectimax game, from wide open to nearly full
+POSITIONS = {
+    "early": [
+        [[2, 2, 0, 2], [4, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]],
+        [[0, 2, 4, 8], [0, 0, 0, 8], [0, 0, 0, 0], [4, 0, 0, 0]],
+    ],
+    "mid": [
+        [[16, 4, 2, 0], [8, 8, 0, 0], [64, 32, 2, 0], [128, 0, 0, 2]],
+        [[512, 64, 128, 16], [0, 8, 16, 16], [0, 2, 4, 0], [0, 2, 0, 0]],
+    ],
+    "late": [
+        [[512, 256, 128, 16], [32, 16, 4, 2], [8, 4, 0, 0], [8, 2, 0, 0]],
+        [[1024, 512, 256, 128], [8, 16, 32, 64], [4, 2, 8, 4], [2, 0, 0, 2]],
+        [[512, 256, 128, 2], [16, 32, 128, 2], [8, 16, 4, 32], [4, 2, 8, 2]],
+    ],
+}
+
+# the original list-of-lists moves, only kept as the --legacy baseline
+def _reverse(mat):
+    new = []
+    for i in range(len(mat)):
+        new.append([])
+        for j in range(len(mat[0])):
+            new[i].append(mat[i][len(mat[0])-j-1])
+    return new
+
+
+def _transpose(mat):
+    new = []
+    for i in range(len(mat[0])):
+        new.append([])
+        for j in range(len(mat)):
+            new[i].append(mat[j][i])
+    return new
+
+
+def _cover_up(mat):
+    new = []
+    for j in range(len(mat)):
+        partial_new = []
+        for i in range(len(mat[0])):
+            partial_new.append(0)
+        new.append(partial_new)
+    done = False
+    for i in range(len(mat)):
+        count = 0
+        for j in range(len(mat[0])):
+            if mat[i][j] != 0:
+                new[i][count] = mat[i][j]
+                if j != count:
+                    done = True
+                count += 1
+    return new, done
+
+
+def _merge(mat, done):
+    for i in range(len(mat)):
+        for j in range(len(mat[0])-1):
+            if mat[i][j] == mat[i][j+1] and mat[i][j] != 0:
+                mat[i][j] *= 2
+                mat[i][j+1] = 0
+                done = True
+    return mat, done
+
+
+def _up_lists(game):
+    # return matrix after shifting up
+    game = _transpose(game)
+    game, done = _cover_up(game)
+    game, done = _merge(game, done)
+    game = _cover_up(game)[0]
+    game = _transpose(game)
+    return game, done
+
+
+def _down_lists(game):
+    # return matrix after shifting down
+    game = _reverse(_transpose(game))
+    game, done = _cover_up(game)
+    game, done = _merge(game, done)
+    game = _cover_up(game)[0]
+    game = _transpose(_reverse(game))
+    return game, done
+
+
+def _left_lists(game):
+    # return matrix after shifting left
+    game, done = _cover_up(game)
+    game, done = _merge(game, done)
+    game = _cover_up(game)[0]
+    return game, done
+
+
+def _right_lists(game):
+    # return matrix after shifting right
+    game = _reverse(game)
+    game, done = _cover_up(game)
+    game, done = _merge(game, done)
+    game = _cover_up(game)[0]
+    game = _reverse(game)
+    return game, done
+
+
+LEGACY_MOVES = [
+    ('up', _up_lists),
+    ('down', _down_lists),
+    ('left', _left_lists),
+    ('right', _right_lists)
+]
+
+
+def all_positions():
+    return [mat for stage in POSITIONS.values() for mat in stage]
+
+
+def search_depth(matrix):
+    # same depth schedule as GameAI.get_best_move
+    empty_tiles = sum(row.count(0) for row in matrix)
+    if empty_tiles > 6:
+        return 4
+    if empty_tiles > 3:
+        return 3
+    return 2
+
+
+class LegacySearch:
+    """The original deepcopy-per-node minimax, kept as the baseline."""
+
+    def __init__(self):
+        self.ai = GameAI()
+        self.nodes = 0
+        self.rng = None
+
+    def evaluate(self, matrix):
+        ai = self.ai
+        return (
+            sum(sum(row) for row in matrix) * 0.2 +
+            sum(row.count(0) for row in matrix) * 60 +
+            ai.calculate_smoothness(matrix) * 30 +
+            ai.calculate_monotonicity(matrix) * 40 +
+            ai.calculate_corner_weight(matrix) * 50
+        )
+
+    def minimax(self, matrix, depth, alpha, beta, is_maximizing):
+        self.nodes += 1
+        game_state = logic.game_state(matrix)
+        if game_state == 'win':
+            return float('inf')
+        if game_state == 'lose':
+            return float('-inf')
+        if depth == 0:
+            return self.evaluate(matrix)
+
+        if is_maximizing:
+            max_eval = float('-inf')
+            for move_name, move_func in LEGACY_MOVES:
+                new_matrix, done = move_func(copy.deepcopy(matrix))
+                if done:
+                    new_matrix = logic.add_random_tile(new_matrix, self.rng)
+                    eval_score = self.minimax(new_matrix, depth - 1, alpha, beta, False)
+                    max_eval = max(max_eval, eval_score)
+                    alpha = max(alpha, eval_score)
+                    if beta <= alpha:
+                        break
+            return max_eval
+
+        min_eval = float('inf')
+        empty_tiles = [
+            (i, j) for i in range(len(matrix)) for j in range(len(matrix[0])) if matrix[i][j] == 0
+        ]
+        for i, j in empty_tiles:
+            new_matrix_2 = copy.deepcopy(matrix)
+            new_matrix_2[i][j] = 2
+            eval_score_2 = self.minimax(new_matrix_2, depth - 1, alpha, beta, True)
+            new_matrix_4 = copy.deepcopy(matrix)
+            new_matrix_4[i][j] = 4
+            eval_score_4 = self.minimax(new_matrix_4, depth - 1, alpha, beta, True)
+            eval_score = 0.9 * eval_score_2 + 0.1 * eval_score_4
+            min_eval = min(min_eval, eval_score)
+            beta = min(beta, eval_score)
+            if beta <= alpha:
+                break
+        return min_eval
+
+    def get_best_move(self, matrix, rng=None):
+        self.rng = rng
+        depth = search_depth(matrix)
+        best_move = None
+        best_score = float('-inf')
+        for move_name, move_func in LEGACY_MOVES:
+            new_matrix, done = move_func(copy.deepcopy(matrix))
+            if done:
+                new_matrix = logic.add_random_tile(new_matrix, self.rng)
+                move_score = self.minimax(new_matrix, depth, float('-inf'), float('inf'), False)
+                if best_move is None or move_score > best_score:
+                    best_score = move_score
+                    best_move = move_name
+        return best_move
+
+
+class CountingAI(GameAI):
+    """GameAI that counts the search nodes it expands."""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.nodes = 0
+
+    def minimax_with_alpha_beta(self, board, depth, alpha, beta, is_maximizing, rng=None):
+        self.nodes += 1
+        return super().minimax_with_alpha_beta(board, depth, alpha, beta, is_maximizing, rng)
+
+    def expectimax_max(self, board, depth, probability):
+        self.nodes += 1
+        return super().expectimax_max(board, depth, probability)
+
+    def expectimax_chance(self, board, depth, probability):
+        self.nodes += 1
+        return super().expectimax_chance(board, depth, probability)
+
+
+def bench_search(searcher, positions, seed=0):
+    # same spawn sequence for every searcher
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for matrix in positions:
+        searcher.get_best_move(matrix, rng)
+    elapsed = time.perf_counter() - start
+    return {
+        "nodes": searcher.nodes,
+        "seconds": elapsed,
+        "nodes_per_second": searcher.nodes / elapsed if elapsed else 0.0,
+    }
+
+
+def percentile(sorted_values, fraction):
+    # nearest-rank percentile of an already sorted list
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def bench_ops(func, args_list, min_seconds):
+    """Call func over args_list repeatedly for at least min_seconds, return ops/second."""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        for args in args_list:
+            func(*args)
+        calls += len(args_list)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return {"ops": calls, "seconds": elapsed, "ops_per_second": calls / elapsed}
+
+
+def _add_random_tile_copy(matrix, rng):
+    # add_random_tile mutates its input, so every call works on a fresh copy
+    return logic.add_random_tile([row[:] for row in matrix], rng)
+
+
+def bench_logic(positions, min_seconds):
+    rng = random.Random(0)
+    args = [(matrix,) for matrix in positions]
+    results = {}
+    for name in ("up", "down", "left", "right", "game_state"):
+        results[f"logic.{name}"] = bench_ops(getattr(logic, name), args, min_seconds)
+    results["logic.add_random_tile"] = bench_ops(
+        _add_random_tile_copy, [(matrix, rng) for matrix in positions], min_seconds
+    )
+    results["GameAI.evaluate_board"] = bench_ops(GameAI().evaluate_board, args, min_seconds)
+    return results
+
+
+def bench_best_move(positions, repeats, **options):
+    """Time get_best_move on every position, repeats times each, with a fresh AI."""
+    ai = CountingAI(**options)
+    latencies = []
+    for _ in range(repeats):
+        # every repeat starts from an empty transposition table and the same
+        # spawns, otherwise the later repeats would only time cache hits
+        ai.new_game()
+        rng = random.Random(0)
+        for matrix in positions:
+            call_start = time.perf_counter()
+            ai.get_best_move(matrix, rng)
+            latencies.append(time.perf_counter() - call_start)
+    elapsed = sum(latencies)
+    latencies.sort()
+    return {
+        "moves": len(latencies),
+        "nodes": ai.nodes,
+        "seconds": elapsed,
+        "nodes_per_second": ai.nodes / elapsed if elapsed else 0.0,
+        "latency_ms_p50": percentile(latencies, 0.50) * 1000,
+        "latency_ms_p90": percentile(latencies, 0.90) * 1000,
+        "latency_ms_p99": percentile(latencies, 0.99) * 1000,
+        "latency_ms_max": latencies[-1] * 1000,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(min_seconds=0.5, repeats=3):
+    positions = all_positions()
+    results = bench_logic(positions, min_seconds)
+    for algorithm in ("minimax", "expectimax"):
+        # stages are timed separately, late positions are the slow ones
+        for stage, stage_positions in POSITIONS.items():
+            results[f"GameAI.get_best_move[{algorithm},{stage}]"] = bench_best_move(
+                stage_positions, repeats, algorithm=algorithm
+            )
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+# metrics where a larger number is better, everything else (latencies) is better smaller
+HIGHER_IS_BETTER = ("ops_per_second", "nodes_per_second")
+REPORTED_METRICS = HIGHER_IS_BETTER + ("latency_ms_p50", "latency_ms_p99")
+
+
+def print_results(report):
+    print(f"--- Benchmarks (commit {report['meta']['commit']}) ---")
+    for name, result in report["results"].items():
+        metrics = ", ".join(
+            f"{metric}={result[metric]:.1f}" for metric in REPORTED_METRICS if metric in result
+        )
+        print(f"{name:45s} {metrics}")
+
+
+def compare(old_report, new_report, threshold=0.10):
+    """Print old vs new for every shared metric, return the names that got worse by > threshold."""
+    regressions = []
+    print(f"--- {old_report['meta']['commit']} -> {new_report['meta']['commit']} ---")
+    for name, new in new_report["results"].items():
+        old = old_report["results"].get(name)
+        if old is None:
+            continue
+        for metric in REPORTED_METRICS:
+            if metric not in new or metric not in old or not old[metric]:
+                continue
+            change = (new[metric] - old[metric]) / old[metric]
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = "  REGRESSION" if worse > threshold else ""
+            if flag:
+                regressions.append(f"{name} {metric}")
+            print(f"{name:45s} {metric:18s} {old[metric]:12.1f} -> {new[metric]:12.1f} "
+                  f"({change:+.1%}){flag}")
+    return regressions
+
+
+def compare_legacy():
+    positions = all_positions()
+    before = bench_search(LegacySearch(), positions)
+    after = bench_search(CountingAI(), positions)
+
+    print("--- Search nodes/second ---")
+    for label, result in (("before (lists + deepcopy)", before), ("after (bitboard)", after)):
+        print(f"{label:28s} {result['nodes']:8d} nodes in {result['seconds']:7.3f}s "
+              f"= {result['nodes_per_second']:10.0f} nodes/s")
+    print(f"speedup: {after['nodes_per_second'] / before['nodes_per_second']:.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the 2048 logic and AI hot paths.")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="compare two JSON result files and exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown reported as a regression (default 0.10)")
+    parser.add_argument("--min-seconds", type=float, default=0.5,
+                        help="minimum time spent on each logic benchmark")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="get_best_move calls per position")
+    parser.add_argument("--legacy", action="store_true",
+                        help="compare against the original deepcopy list search instead")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old_report = json.load(f)
+        with open(args.compare[1]) as f:
+            new_report = json.load(f)
+        regressions = compare(old_report, new_report, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s)")
+            return 1
+        return 0
+
+    if args.legacy:
+        compare_legacy()
+        return 0
+
+    report = run_suite(args.min_seconds, args.repeats)
+    print_results(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,470 @@
+"""
+Bitboard representation of the 4x4 board.
+
+A board is packed into a single 64-bit integer with 4 bits per cell holding
+the tile exponent (0 for an empty cell, 1 for a 2, 2 for a 4, ... 15 for a
+32768). Cell (i, j) lives in nibble 4 * i + j, so row i is the 16-bit chunk
+starting at bit 16 * i with column 0 in its lowest nibble.
+
+Left/right moves are a lookup per row in a precomputed 65,536-entry table and
+up/down moves reuse those tables on the transposed board.
+"""
+import hashlib
+import os
+import random
+from array import array
+from collections import namedtuple
+from itertools import product
+
+ROW_MASK = 0xFFFF
+MAX_EXPONENT = 15
+WIN_EXPONENT = 11  # 2048
+
+
+def _pack_row(line):
+    row = 0
+    for j, exponent in enumerate(line):
+        row |= exponent << (4 * j)
+    return row
+
+
+def _unpack_row(row):
+    return [(row >> (4 * j)) & 0xF for j in range(4)]
+
+
+def _slide_left(line):
+    # slide every tile towards index 0, merging each pair at most once;
+    # returns the new line and the merge score (sum of the tiles created)
+    tiles = [x for x in line if x != 0]
+    result = []
+    score = 0
+    i = 0
+    while i < len(tiles):
+        if i + 1 < len(tiles) and tiles[i] == tiles[i + 1]:
+            # there is no room for 65536, pretend 32768 + 32768 = 32768
+            result.append(min(tiles[i] + 1, MAX_EXPONENT))
+            score += 1 << (tiles[i] + 1)
+            i += 2
+        else:
+            result.append(tiles[i])
+            i += 1
+    return result + [0] * (len(line) - len(result)), score
+
+
+def reverse_row(row):
+    return ((row & 0xF) << 12) | ((row & 0xF0) << 4) | ((row >> 4) & 0xF0) | (row >> 12)
+
+
+def _row_info(line, moved_line):
+    # packed per-row facts: merges made by a left/right move (bits 0-1), largest
+    # exponent those merges create (bits 2-5), adjacent equal pair (bit 6) and
+    # the row's largest exponent (bits 7-10)
+    merges = sum(1 for x in line if x) - sum(1 for x in moved_line if x)
+    created = max(moved_line) if merges else 0
+    has_pair = any(line[j] and line[j] == line[j + 1] for j in range(3))
+    return merges | (created << 2) | (has_pair << 6) | (max(line) << 7)
+
+
+def _build_row_tables():
+    left_table = []
+    score_table = []
+    info_table = []
+    # product() varies the last cell fastest, so the rows come out in order
+    for d, c, b, a in product(range(MAX_EXPONENT + 1), repeat=4):
+        line = (a, b, c, d)
+        moved_line, score = _slide_left(line)
+        left_table.append(_pack_row(moved_line))
+        score_table.append(score)
+        info_table.append(_row_info(line, moved_line))
+    return left_table, score_table, info_table
+
+
+def _tables_cache_path(source, name):
+    # named after the source file's contents, so changing its rules rebuilds the tables
+    with open(source, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:16]
+    return os.path.join(os.path.dirname(os.path.abspath(source)), "__pycache__",
+                        f"{name}.{digest}.bin")
+
+
+def cached_row_tables(source, name, build, count, typecode="I"):
+    """
+    Return build(), count per-row tables of ROW_MASK + 1 numbers each, cached
+    next to the bytecode of source (the module whose code builds them) as one
+    array of typecode. Building takes a few hundred milliseconds in every
+    process that needs the tables, spawned pool workers included; a missing
+    or unwritable cache just rebuilds.
+    """
+    size = ROW_MASK + 1
+    try:
+        path = _tables_cache_path(source, name)
+    except OSError:
+        return build()
+    try:
+        cached = array(typecode)
+        with open(path, "rb") as f:
+            cached.fromfile(f, count * size)
+        values = cached.tolist()
+        return tuple(values[i * size:(i + 1) * size] for i in range(count))
+    except (OSError, EOFError):
+        pass
+    tables = build()
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as f:
+            array(typecode, [value for table in tables for value in table]).tofile(f)
+        # concurrent importers each write their own file and rename over the same path
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return tables
+
+
+# merges and created tiles are the same whichever way the row slides, so the
+# score and info tables serve both directions
+ROW_LEFT_TABLE, ROW_SCORE_TABLE, ROW_INFO_TABLE = cached_row_tables(
+    __file__, "bitboard_tables", _build_row_tables, 3
+)
+# sliding right is sliding left on the mirrored row
+ROW_RIGHT_TABLE = [reverse_row(ROW_LEFT_TABLE[reverse_row(row)]) for row in range(ROW_MASK + 1)]
+
+
+def transpose(board):
+    # swap nibbles across the main diagonal in two passes: 1x1 blocks, then 2x2 blocks
+    a1 = board & 0xF0F00F0FF0F00F0F
+    a2 = board & 0x0000F0F00000F0F0
+    a3 = board & 0x0F0F00000F0F0000
+    a = a1 | (a2 << 12) | (a3 >> 12)
+    b1 = a & 0xFF00FF0000FF00FF
+    b2 = a & 0x00FF00FF00000000
+    b3 = a & 0x00000000FF00FF00
+    return b1 | (b2 >> 24) | (b3 << 24)
+
+
+def _apply_row_table(board, table):
+    return (
+        table[board & ROW_MASK]
+        | table[(board >> 16) & ROW_MASK] << 16
+        | table[(board >> 32) & ROW_MASK] << 32
+        | table[(board >> 48) & ROW_MASK] << 48
+    )
+
+
+def move_left(board):
+    return _apply_row_table(board, ROW_LEFT_TABLE)
+
+
+def move_right(board):
+    return _apply_row_table(board, ROW_RIGHT_TABLE)
+
+
+def move_up(board):
+    return transpose(_apply_row_table(transpose(board), ROW_LEFT_TABLE))
+
+
+def move_down(board):
+    return transpose(_apply_row_table(transpose(board), ROW_RIGHT_TABLE))
+
+
+MOVES = [
+    ('up', move_up),
+    ('down', move_down),
+    ('left', move_left),
+    ('right', move_right)
+]
+
+# one entry of afterstates(): the move, the board it leaves (before the
+# spawn), whether it changed anything and the score of the tiles it merged
+Afterstate = namedtuple('Afterstate', 'move board legal score')
+
+
+def _moved_boards(board):
+    # (up, down, left, right) boards plus the merge score along columns and rows;
+    # rows and columns are read once and shared by the two moves on each axis
+    left = ROW_LEFT_TABLE
+    right = ROW_RIGHT_TABLE
+    score = ROW_SCORE_TABLE
+    cols = transpose(board)
+    r0, r1, r2, r3 = (board & ROW_MASK, (board >> 16) & ROW_MASK,
+                      (board >> 32) & ROW_MASK, board >> 48)
+    c0, c1, c2, c3 = (cols & ROW_MASK, (cols >> 16) & ROW_MASK,
+                      (cols >> 32) & ROW_MASK, cols >> 48)
+    return (
+        transpose(left[c0] | left[c1] << 16 | left[c2] << 32 | left[c3] << 48),
+        transpose(right[c0] | right[c1] << 16 | right[c2] << 32 | right[c3] << 48),
+        left[r0] | left[r1] << 16 | left[r2] << 32 | left[r3] << 48,
+        right[r0] | right[r1] << 16 | right[r2] << 32 | right[r3] << 48,
+        score[c0] + score[c1] + score[c2] + score[c3],
+        score[r0] + score[r1] + score[r2] + score[r3],
+    )
+
+
+def afterstates(board):
+    """
+    All four moves of board in one pass, in MOVES order.
+
+    Rows and columns are read once and shared between the two moves along
+    each axis, so this is cheaper than calling the four move functions.
+    """
+    up, down, moved_left, moved_right, col_score, row_score = _moved_boards(board)
+    return [
+        Afterstate('up', up, up != board, col_score),
+        Afterstate('down', down, down != board, col_score),
+        Afterstate('left', moved_left, moved_left != board, row_score),
+        Afterstate('right', moved_right, moved_right != board, row_score),
+    ]
+
+
+def legal_moves(board):
+    # [(move, new_board)] for the moves that change board, in MOVES order
+    up, down, moved_left, moved_right, _, _ = _moved_boards(board)
+    moves = []
+    if up != board:
+        moves.append(('up', up))
+    if down != board:
+        moves.append(('down', down))
+    if moved_left != board:
+        moves.append(('left', moved_left))
+    if moved_right != board:
+        moves.append(('right', moved_right))
+    return moves
+
+
+def get_cell(board, i, j):
+    return (board >> (4 * (4 * i + j))) & 0xF
+
+
+LOW_NIBBLE_BITS = 0x1111111111111111
+
+
+def empty_mask(board):
+    # bit 4 * k is set when nibble k is empty
+    m = board | (board >> 1)
+    m |= m >> 2
+    return ~m & LOW_NIBBLE_BITS
+
+
+def empty_positions(board):
+    # nibble indices (4 * i + j) of every empty cell, read straight off the mask
+    m = empty_mask(board)
+    positions = []
+    while m:
+        low = m & -m
+        positions.append(low.bit_length() >> 2)
+        m ^= low
+    return positions
+
+
+def count_empty(board):
+    return empty_mask(board).bit_count()
+
+
+def max_exponent(board):
+    info = ROW_INFO_TABLE
+    return max(
+        info[board & ROW_MASK], info[(board >> 16) & ROW_MASK],
+        info[(board >> 32) & ROW_MASK], info[board >> 48]
+    ) >> 7
+
+
+def has_merge(board):
+    # True when two equal tiles touch horizontally or vertically
+    info = ROW_INFO_TABLE
+    cols = transpose(board)
+    return bool(
+        (info[board & ROW_MASK] | info[(board >> 16) & ROW_MASK]
+         | info[(board >> 32) & ROW_MASK] | info[board >> 48]
+         | info[cols & ROW_MASK] | info[(cols >> 16) & ROW_MASK]
+         | info[(cols >> 32) & ROW_MASK] | info[cols >> 48]) & 0x40
+    )
+
+
+def choose_spawn(empty_cells, rng=None):
+    """
+    Pick the next spawn from a list of empty cells in one draw, no retries.
+
+    Returns (cell, exponent): the chosen entry of empty_cells and 1 for a 2
+    tile (90%) or 2 for a 4 tile (10%). rng is a random.Random-like spawn
+    source, the global random module by default. This is shared by the
+    bitboard and list-of-lists games so both draw spawns the same way.
+    """
+    rng = rng or random
+    cell = empty_cells[rng.randrange(len(empty_cells))]
+    return cell, 1 if rng.random() < 0.9 else 2
+
+
+def add_random_tile(board, rng=None):
+    empty = empty_positions(board)
+    if not empty:
+        return board
+    k, exponent = choose_spawn(empty, rng)
+    return board | (exponent << (4 * k))
+
+
+def has_exponent(board, exponent):
+    for k in range(16):
+        if (board >> (4 * k)) & 0xF == exponent:
+            return True
+    return False
+
+
+def is_win(board):
+    # a 4096 can only be made from two 2048s, so this matches logic's "2048 on the board"
+    return max_exponent(board) >= WIN_EXPONENT
+
+
+def game_state(board):
+    # same rules as logic.game_state: a 2048 tile wins
+    if is_win(board):
+        return 'win'
+    if empty_mask(board):
+        return 'not over'
+    # a full board is only playable if some move merges tiles
+    if has_merge(board):
+        return 'not over'
+    return 'lose'
+
+
+def from_matrix(mat):
+    board = 0
+    for i in range(4):
+        for j in range(4):
+            value = mat[i][j]
+            if value:
+                board |= (value.bit_length() - 1) << (4 * (4 * i + j))
+    return board
+
+
+def to_matrix(board):
+    mat = []
+    for i in range(4):
+        row = []
+        for j in range(4):
+            exponent = (board >> (4 * (4 * i + j))) & 0xF
+            row.append(1 << exponent if exponent else 0)
+        mat.append(row)
+    return mat
+
+
+MOVE_FUNCS = dict(MOVES)
+
+
+class Board:
+    """
+    Immutable, hashable 4x4 board backed by a single bitboard int.
+
+    Moves and spawns return a new Board and never touch the original, so a
+    position can be shared or used as a dict key without copying.
+
+    The board also carries its largest exponent, its empty-cell count and
+    whether any two equal tiles touch. move() and spawn() update these from
+    the row tables instead of rescanning the cells, so game_state() is O(1).
+    """
+    __slots__ = ('bits', 'max_exponent', 'empty', 'can_merge')
+
+    def __init__(self, bits=0):
+        self._set(bits, max_exponent(bits), count_empty(bits), has_merge(bits))
+
+    @classmethod
+    def _make(cls, bits, max_exp, empty, can_merge):
+        board = object.__new__(cls)
+        board._set(bits, max_exp, empty, can_merge)
+        return board
+
+    def _set(self, bits, max_exp, empty, can_merge):
+        object.__setattr__(self, 'bits', bits)
+        object.__setattr__(self, 'max_exponent', max_exp)
+        object.__setattr__(self, 'empty', empty)
+        object.__setattr__(self, 'can_merge', can_merge)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Board is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Board is immutable")
+
+    @classmethod
+    def from_matrix(cls, mat):
+        return cls(from_matrix(mat))
+
+    def to_matrix(self):
+        return to_matrix(self.bits)
+
+    def move(self, direction):
+        # returns (new_board, done) like the functions in logic.py
+        old = self.bits
+        bits = MOVE_FUNCS[direction](old)
+        if bits == old:
+            return self, False
+        # every merge frees one cell and the new max can only come from a merge
+        lines = transpose(old) if direction in ('up', 'down') else old
+        info = ROW_INFO_TABLE
+        merges = 0
+        created = 0
+        for shift in (0, 16, 32, 48):
+            row_info = info[(lines >> shift) & ROW_MASK]
+            merges += row_info & 0x3
+            created = max(created, (row_info >> 2) & 0xF)
+        return Board._make(
+            bits, max(self.max_exponent, created), self.empty + merges, has_merge(bits)
+        ), True
+
+    def spawn(self, position, exponent):
+        # place a tile of value 2 ** exponent in the empty cell at nibble position
+        bits = self.bits | (exponent << (4 * position))
+        return Board._make(
+            bits, max(self.max_exponent, exponent), self.empty - 1, has_merge(bits)
+        )
+
+    def add_random_tile(self, rng=None):
+        empty = empty_positions(self.bits)
+        if not empty:
+            return self
+        position, exponent = choose_spawn(empty, rng)
+        return self.spawn(position, exponent)
+
+    def empty_positions(self):
+        return empty_positions(self.bits)
+
+    def count_empty(self):
+        return self.empty
+
+    def max_tile(self):
+        return 1 << self.max_exponent if self.max_exponent else 0
+
+    def game_state(self):
+        if self.max_exponent >= WIN_EXPONENT:
+            return 'win'
+        if self.empty or self.can_merge:
+            return 'not over'
+        return 'lose'
+
+    def __getitem__(self, index):
+        # board[i][j] reads like the list-of-lists matrix
+        if index < 0:
+            index += 4
+        if not 0 <= index < 4:
+            raise IndexError("board row index out of range")
+        row = (self.bits >> (16 * index)) & ROW_MASK
+        return tuple(1 << e if e else 0 for e in _unpack_row(row))
+
+    def __len__(self):
+        return 4
+
+    def __int__(self):
+        return self.bits
+
+    def __eq__(self, other):
+        if isinstance(other, Board):
+            return self.bits == other.bits
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __reduce__(self):
+        return (Board._make, (self.bits, self.max_exponent, self.empty, self.can_merge))
+
+    def __repr__(self):
+        return f"Board(0x{self.bits:016x})"
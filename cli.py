@@ -0,0 +1,186 @@
+"""
+Headless command line for playing, simulating and benchmarking.
+
+    python cli.py play --games 3 --algorithm expectimax --seed 1
+    python cli.py simulate --games 1000 --workers 8 --seed 0 --output results.jsonl
+    python cli.py bench --output bench.json
+
+play runs games one after another in this process, and simulate spreads them
+over worker processes (simulation.run_batch). Both print live progress
+(games/s, moves/s, ETA) and a final summary. bench runs the benchmark suite.
+"""
+import argparse
+import sys
+import time
+
+DEFAULT_WORKERS = 4
+
+
+class Progress:
+    """Live games/s, moves/s and ETA line, redrawn in place on a terminal."""
+
+    def __init__(self, total, stream=sys.stderr, interval=0.5):
+        self.total = total
+        self.stream = stream
+        self.interval = interval
+        self.games = 0
+        self.moves = 0
+        self.start = time.perf_counter()
+        self._last_print = 0.0
+        self._tty = stream.isatty()
+
+    def update(self, moves):
+        self.games += 1
+        self.moves += moves
+        now = time.perf_counter()
+        if self.games == self.total or now - self._last_print >= self.interval:
+            self._last_print = now
+            self._print(now - self.start)
+
+    def _print(self, elapsed):
+        games_per_second = self.games / elapsed if elapsed else 0.0
+        moves_per_second = self.moves / elapsed if elapsed else 0.0
+        remaining = self.total - self.games
+        eta = remaining / games_per_second if games_per_second else 0.0
+        line = (f"[{self.games}/{self.total}] {games_per_second:.2f} games/s, "
+                f"{moves_per_second:.0f} moves/s, ETA {format_seconds(eta)}")
+        if self._tty:
+            end = "\n" if self.games == self.total else ""
+            self.stream.write("\r" + line.ljust(72) + end)
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+
+def format_seconds(seconds):
+    minutes, seconds = divmod(int(seconds + 0.5), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def ai_options(args):
+    # GameAI keyword arguments from the shared search options
+    options = {"algorithm": args.algorithm}
+    if args.depth is not None:
+        options["search_depth"] = args.depth
+    if args.time_budget is not None:
+        options["time_budget_ms"] = args.time_budget
+    if args.node_budget is not None:
+        options["node_budget"] = args.node_budget
+    if args.evaluator is not None:
+        options["evaluator"] = args.evaluator
+    if args.book is not None:
+        options["book"] = args.book
+    return options
+
+
+def cmd_play(args):
+    # the commands import what they need, so --help and usage errors are instant
+    import json
+    from ai_logic import GameAI
+    from search_stats import SearchStats
+    from simulation import game_seed, print_summary, summarize
+    from test_parallel import simulate_game
+
+    ai = GameAI(**ai_options(args), stats=SearchStats() if args.stats else None)
+    progress = Progress(args.games)
+    results = []
+    out = open(args.output, "w") if args.output else None
+    start = time.perf_counter()
+    try:
+        for game_id in range(1, args.games + 1):
+            game_start = time.perf_counter()
+            # the same per-game seeds as simulate, so with --deterministic both play
+            # the same games
+            seed = None if args.seed is None else game_seed(args.seed, game_id)
+            result = simulate_game(game_id, ai=ai, seed=seed, deterministic=args.deterministic)
+            result["seconds"] = time.perf_counter() - game_start
+            results.append(result)
+            if out:
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+            progress.update(result["moves"])
+    finally:
+        if out:
+            out.close()
+    summary = summarize(results, time.perf_counter() - start)
+    if args.stats:
+        summary["search_stats"] = ai.stats.to_dict()
+    print_summary(summary)
+    return 0
+
+
+def cmd_simulate(args):
+    from simulation import print_summary, run_batch
+
+    progress = Progress(args.games)
+    summary = run_batch(
+        args.games, args.workers, chunk_size=args.chunk_size, seed=args.seed,
+        output=args.output, ai_options=ai_options(args),
+        on_result=lambda result: progress.update(result["moves"]),
+        collect_stats=args.stats, replay_dir=args.replay_dir,
+        deterministic=args.deterministic,
+    )
+    print_summary(summary)
+    return 0
+
+
+def cmd_bench(args):
+    import benchmark
+
+    argv = []
+    if args.output:
+        argv += ["--output", args.output]
+    argv += ["--min-seconds", str(args.min_seconds), "--repeats", str(args.repeats)]
+    return benchmark.main(argv)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Run 2048 AI games without the UI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    search = argparse.ArgumentParser(add_help=False)
+    search.add_argument("--algorithm", choices=("minimax", "expectimax"), default="minimax")
+    search.add_argument("--depth", type=int, help="fixed search depth (default: by empty cells)")
+    search.add_argument("--time-budget", type=float, metavar="MS",
+                        help="search each move for this many milliseconds")
+    search.add_argument("--node-budget", type=int, help="adaptive depth under this many nodes")
+    search.add_argument("--evaluator", metavar="WEIGHTS", help="n-tuple network weights (.npy)")
+    search.add_argument("--book", help="opening book file")
+
+    games = argparse.ArgumentParser(add_help=False)
+    games.add_argument("--games", type=int, default=10)
+    games.add_argument("--seed", type=int,
+                       help="seed for reproducible spawns (and games, with --deterministic "
+                            "and without --time-budget)")
+    games.add_argument("--deterministic", action="store_true",
+                       help="reset the AI's caches before every game")
+    games.add_argument("--output", help="write one JSON line per game to this file")
+    games.add_argument("--stats", action="store_true", help="report search statistics")
+
+    play = commands.add_parser("play", parents=[search, games],
+                               help="play games one by one in this process")
+    play.set_defaults(func=cmd_play)
+
+    simulate = commands.add_parser("simulate", parents=[search, games],
+                                   help="play games across worker processes")
+    simulate.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    simulate.add_argument("--chunk-size", type=int, help="games per worker task")
+    simulate.add_argument("--replay-dir", help="record every game as a binary replay here")
+    simulate.set_defaults(func=cmd_simulate)
+
+    bench = commands.add_parser("bench", help="run the benchmark suite")
+    bench.add_argument("--output", help="write the results as JSON to this file")
+    bench.add_argument("--min-seconds", type=float, default=0.5)
+    bench.add_argument("--repeats", type=int, default=3)
+    bench.set_defaults(func=cmd_bench)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
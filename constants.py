@@ -2,6 +2,9 @@ SIZE = 400
 GRID_LEN = 4
 GRID_PADDING = 10
 
+# how often (ms) the UI checks whether the background AI search has finished
+AI_POLL_INTERVAL = 20
+
 
 BACKGROUND_COLOR_GAME = "#92877d"
 BACKGROUND_COLOR_CELL_EMPTY = "#9e948a"
@@ -48,6 +51,10 @@ FONT = ("Verdana",40,"bold")
 
 KEY_QUIT = "Escape"
 KEY_BACK = "b"
+KEY_REDO = "n"
+
+# positions kept for undo/redo
+HISTORY_CAP = 100000
 
 KEY_UP = "Up"
 KEY_DOWN = "Down"
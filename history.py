@@ -0,0 +1,107 @@
+"""
+Compact undo/redo history for a 4x4 game.
+
+Each position is stored as its 64-bit bitboard in an array('Q') buffer, with
+the move that led to it in a parallel array('b'), so a long autoplay session
+costs 9 bytes per move instead of a nested list per board. Undo and redo
+only move a cursor. A push after an undo drops the redo tail, like an editor.
+
+At most cap positions are kept. The oldest are dropped in blocks of
+cap // 8 so that pushing stays O(1) amortized.
+
+The positions up to the cursor are also the replay of the game: save() writes
+them out and load() reads them back.
+"""
+import json
+from array import array
+
+import bitboard
+
+# move names stored in the history, indexed by the codes in the moves array
+MOVE_NAMES = [name for name, _ in bitboard.MOVES]
+NO_MOVE = -1
+
+DEFAULT_CAP = 100000
+
+
+class GameHistory:
+    def __init__(self, cap=DEFAULT_CAP):
+        if cap < 1:
+            raise ValueError("cap must be at least 1")
+        self.cap = cap
+        self._trim = max(1, cap // 8)
+        self._boards = array('Q')
+        self._moves = array('b')
+        # index of the current position, -1 while empty
+        self._cursor = -1
+
+    def reset(self, board):
+        """Forget everything and start from board (a bitboard or a matrix)."""
+        del self._boards[:]
+        del self._moves[:]
+        self._cursor = -1
+        self.push(board)
+
+    def push(self, board, move=None):
+        """Record board as the new current position, reached by move."""
+        if not isinstance(board, int):
+            board = bitboard.from_matrix(board)
+        if self._cursor + 1 < len(self._boards):
+            del self._boards[self._cursor + 1:]
+            del self._moves[self._cursor + 1:]
+        self._boards.append(board)
+        self._moves.append(NO_MOVE if move is None else MOVE_NAMES.index(move))
+        if len(self._boards) > self.cap:
+            del self._boards[:self._trim]
+            del self._moves[:self._trim]
+        self._cursor = len(self._boards) - 1
+
+    def can_undo(self):
+        return self._cursor > 0
+
+    def can_redo(self):
+        return self._cursor + 1 < len(self._boards)
+
+    def undo(self):
+        """Step back one move and return that board as a matrix, or None."""
+        if not self.can_undo():
+            return None
+        self._cursor -= 1
+        return self.current()
+
+    def redo(self):
+        """Step forward one undone move and return that board as a matrix, or None."""
+        if not self.can_redo():
+            return None
+        self._cursor += 1
+        return self.current()
+
+    def current(self):
+        if self._cursor < 0:
+            return None
+        return bitboard.to_matrix(self._boards[self._cursor])
+
+    def __len__(self):
+        # positions up to and including the current one
+        return self._cursor + 1
+
+    def replay(self):
+        """(move, board) pairs from the first position to the current one."""
+        return [
+            (MOVE_NAMES[code] if code != NO_MOVE else None, board)
+            for board, code in zip(self._boards[:self._cursor + 1],
+                                   self._moves[:self._cursor + 1])
+        ]
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({"replay": self.replay()}, f)
+
+    @classmethod
+    def load(cls, path, cap=DEFAULT_CAP):
+        with open(path) as f:
+            data = json.load(f)
+        history = cls(cap)
+        for move, board in data["replay"]:
+            history.push(board, move)
+        return history
@@ -0,0 +1,97 @@
+"""
+Size-parametric moves for boards of any shape (3x3, 5x5, 6x6, NxM...).
+
+A move slides every row (left/right) or column (up/down) independently, so
+it only needs a line -> moved line lookup. The lookup tables are per line
+length and keyed by the line's tile values:
+
+* short lines (every 3-cell line of tiles up to 32768 is only 4,096 entries)
+  get their whole table precomputed the first time that length is used;
+* longer lines are filled in lazily as they are met, capped at
+  LAZY_TABLE_LIMIT entries per length, since the lines a game actually
+  produces are a tiny, highly repetitive subset of all possible ones.
+
+The 4x4 board uses the bitboard row tables in bitboard.py instead.
+"""
+import itertools
+
+# exponents covered by the precomputed tables (tiles up to 32768)
+MAX_EXPONENT = 15
+# precompute a line length when all of its lines fit in this many entries
+PRECOMPUTE_LIMIT = 1 << 16
+# lazily filled tables are reset once they grow past this
+LAZY_TABLE_LIMIT = 1 << 18
+
+# line length -> {line tuple: (moved line tuple, changed, merge score)}
+_tables = {}
+
+
+def slide_line(line):
+    # slide every tile towards index 0, merging each pair at most once
+    tiles = [x for x in line if x != 0]
+    result = []
+    score = 0
+    i = 0
+    while i < len(tiles):
+        if i + 1 < len(tiles) and tiles[i] == tiles[i + 1]:
+            result.append(tiles[i] * 2)
+            score += tiles[i] * 2
+            i += 2
+        else:
+            result.append(tiles[i])
+            i += 1
+    moved = tuple(result) + (0,) * (len(line) - len(result))
+    return moved, moved != tuple(line), score
+
+
+def line_table(length):
+    table = _tables.get(length)
+    if table is None:
+        table = {}
+        if (MAX_EXPONENT + 1) ** length <= PRECOMPUTE_LIMIT:
+            for exponents in itertools.product(range(MAX_EXPONENT + 1), repeat=length):
+                line = tuple(1 << e if e else 0 for e in exponents)
+                table[line] = slide_line(line)
+        _tables[length] = table
+    return table
+
+
+def move_line(line):
+    """Slide one line towards index 0, returns (moved line, changed, merge score)."""
+    table = _tables.get(len(line)) or line_table(len(line))
+    result = table.get(line)
+    if result is None:
+        result = slide_line(line)
+        if len(table) >= LAZY_TABLE_LIMIT:
+            table.clear()
+        table[line] = result
+    return result
+
+
+def move_matrix_scored(mat, direction):
+    """Apply a move to an NxM matrix, returns (new matrix, done, merge score)."""
+    vertical = direction in ('up', 'down')
+    backwards = direction in ('right', 'down')
+    lines = zip(*mat) if vertical else (tuple(row) for row in mat)
+
+    done = False
+    score = 0
+    moved_lines = []
+    for line in lines:
+        if backwards:
+            moved, changed, line_score = move_line(line[::-1])
+            moved = moved[::-1]
+        else:
+            moved, changed, line_score = move_line(line)
+        done = done or changed
+        score += line_score
+        moved_lines.append(moved)
+
+    if vertical:
+        moved_lines = zip(*moved_lines)
+    return [list(line) for line in moved_lines], done, score
+
+
+def move_matrix(mat, direction):
+    """Apply a move to an NxM matrix, returns (new matrix, done) like logic.left."""
+    return move_matrix_scored(mat, direction)[:2]
@@ -1,22 +1,29 @@
-import random
-import constants as c
+import bitboard
+import line_moves
 
-def new_game(n):
+# Every function that spawns tiles takes an optional rng: any object with the
+# random.Random interface (e.g. random.Random(seed)) that supplies the spawns.
+# Without one the global random module is used.
+
+def new_game(n, rng=None, cols=None):
+    # n x n board, or n rows by cols columns
     matrix = []
     for i in range(n):
-        matrix.append([0] * n)
-    matrix = add_random_tile(matrix)
-    matrix = add_random_tile(matrix)
+        matrix.append([0] * (cols or n))
+    matrix = add_random_tile(matrix, rng)
+    matrix = add_random_tile(matrix, rng)
     return matrix
 
-def add_random_tile(mat):
-    a = random.randint(0, len(mat) - 1)
-    b = random.randint(0, len(mat) - 1)
-    while mat[a][b] != 0:
-        a = random.randint(0, len(mat) - 1)
-        b = random.randint(0, len(mat) - 1)
+def add_random_tile(mat, rng=None):
+    # pick among the empty cells directly instead of retrying random coordinates
+    empty_cells = [
+        (i, j) for i in range(len(mat)) for j in range(len(mat[0])) if mat[i][j] == 0
+    ]
+    if not empty_cells:
+        return mat
     # 90% chance to spawn a 2, 10% chance to spawn a 4
-    mat[a][b] = 2 if random.random() < 0.9 else 4
+    (a, b), exponent = bitboard.choose_spawn(empty_cells, rng)
+    mat[a][b] = 1 << exponent
     return mat
 
 def game_state(mat):
@@ -37,93 +44,60 @@ def game_state(mat):
         for j in range(len(mat[0])-1):
             if mat[i][j] == mat[i+1][j] or mat[i][j+1] == mat[i][j]:
                 return 'not over'
-    for k in range(len(mat)-1):  # to check the left/right entries on the last row
+    for k in range(len(mat[0])-1):  # to check the left/right entries on the last row
         if mat[len(mat)-1][k] == mat[len(mat)-1][k+1]:
             return 'not over'
     for j in range(len(mat)-1):  # check up/down entries on last column
-        if mat[j][len(mat)-1] == mat[j+1][len(mat)-1]:
+        if mat[j][len(mat[0])-1] == mat[j+1][len(mat[0])-1]:
             return 'not over'
     return 'lose'
 
-def reverse(mat):
-    new = []
-    for i in range(len(mat)):
-        new.append([])
-        for j in range(len(mat[0])):
-            new[i].append(mat[i][len(mat[0])-j-1])
-    return new
-
-
-def transpose(mat):
-    new = []
-    for i in range(len(mat[0])):
-        new.append([])
-        for j in range(len(mat)):
-            new[i].append(mat[j][i])
-    return new
+def _is_bitboard_size(game):
+    return len(game) == 4 and len(game[0]) == 4
 
+def _bitboard_move(game, move_func):
+    # 4x4 boards go through the bitboard row tables, the result is a fresh matrix
+    board = bitboard.from_matrix(game)
+    new_board = move_func(board)
+    return bitboard.to_matrix(new_board), new_board != board
 
-def cover_up(mat):
-    new = []
-    for j in range(c.GRID_LEN):
-        partial_new = []
-        for i in range(c.GRID_LEN):
-            partial_new.append(0)
-        new.append(partial_new)
-    done = False
-    for i in range(c.GRID_LEN):
-        count = 0
-        for j in range(c.GRID_LEN):
-            if mat[i][j] != 0:
-                new[i][count] = mat[i][j]
-                if j != count:
-                    done = True
-                count += 1
-    return new, done
+# other sizes go through the per-length line tables in line_moves.py
 
-def merge(mat, done):
-    for i in range(c.GRID_LEN):
-        for j in range(c.GRID_LEN-1):
-            if mat[i][j] == mat[i][j+1] and mat[i][j] != 0:
-                mat[i][j] *= 2
-                mat[i][j+1] = 0
-                done = True
-    return mat, done
+def afterstates(game):
+    """
+    Every move of game in one pass: a list of (move, new matrix, done, merge score)
+    in up/down/left/right order, so callers do not have to play a move just to
+    learn whether it is legal.
+    """
+    if _is_bitboard_size(game):
+        return [
+            (a.move, bitboard.to_matrix(a.board), a.legal, a.score)
+            for a in bitboard.afterstates(bitboard.from_matrix(game))
+        ]
+    return [
+        (direction,) + line_moves.move_matrix_scored(game, direction)
+        for direction in ('up', 'down', 'left', 'right')
+    ]
 
 def up(game):
-    # print("up")
-    # return matrix after shifting up
-    game = transpose(game)
-    game, done = cover_up(game)
-    game, done = merge(game, done)
-    game = cover_up(game)[0]
-    game = transpose(game)
-    return game, done
+    if _is_bitboard_size(game):
+        return _bitboard_move(game, bitboard.move_up)
+    return line_moves.move_matrix(game, 'up')
 
 def down(game):
-    # print("down")
-    # return matrix after shifting down
-    game = reverse(transpose(game))
-    game, done = cover_up(game)
-    game, done = merge(game, done)
-    game = cover_up(game)[0]
-    game = transpose(reverse(game))
-    return game, done
+    if _is_bitboard_size(game):
+        return _bitboard_move(game, bitboard.move_down)
+    return line_moves.move_matrix(game, 'down')
 
 def left(game):
-    # print("left")
-    # return matrix after shifting left
-    game, done = cover_up(game)
-    game, done = merge(game, done)
-    game = cover_up(game)[0]
-    return game, done
+    if _is_bitboard_size(game):
+        return _bitboard_move(game, bitboard.move_left)
+    return line_moves.move_matrix(game, 'left')
 
 def right(game):
-    # print("right")
-    # return matrix after shifting right
-    game = reverse(game)
-    game, done = cover_up(game)
-    game, done = merge(game, done)
-    game = cover_up(game)[0]
-    game = reverse(game)
-    return game, done
\ No newline at end of file
+    if _is_bitboard_size(game):
+        return _bitboard_move(game, bitboard.move_right)
+    return line_moves.move_matrix(game, 'right')
+
+# move name (as returned by GameAI.get_best_move) -> move function
+MOVES = {'up': up, 'down': down, 'left': left, 'right': right}
@@ -0,0 +1,137 @@
+"""
+N-tuple network board evaluator.
+
+An n-tuple network scores a board as the sum of one learned weight per
+tuple. A tuple is a fixed group of cells, and the exponents in those cells
+form the index into that tuple's weight table. With the default tuples (the
+4 rows, 4 columns and 9 2x2 squares) every table has 16**4 = 65,536 entries,
+so a board is scored with 17 lookups. Rows and columns read a 16-bit chunk
+of the bitboard, and squares put together two 8-bit chunks.
+
+All the weights live in one float32 array of shape (tuples, 16**n).
+save() writes it as a .npy file, and load() memory-maps it back, so several
+processes share the same pages. Untrained weights are all zero; td_training.py
+learns them by self-play.
+
+Any object with evaluate(board) and evaluate_many(boards), taking bitboards,
+can be used as a GameAI evaluator; this one and heuristics.HeuristicEvaluator
+are the two in the repo.
+"""
+import numpy as np
+
+import bitboard
+from heuristics import transpose_many
+
+ROWS = [tuple(4 * i + j for j in range(4)) for i in range(4)]
+COLUMNS = [tuple(4 * i + j for i in range(4)) for j in range(4)]
+SQUARES = [
+    (4 * i + j, 4 * i + j + 1, 4 * (i + 1) + j, 4 * (i + 1) + j + 1)
+    for i in range(3) for j in range(3)
+]
+DEFAULT_TUPLES = ROWS + COLUMNS + SQUARES
+
+
+def _runs(cells):
+    # split cells into runs of consecutive cells within one row, as
+    # (bit shift in the board, mask, bit shift in the tuple index)
+    runs = []
+    k = 0
+    while k < len(cells):
+        end = k + 1
+        while (end < len(cells) and cells[end] == cells[end - 1] + 1
+               and cells[end] % 4 != 0):
+            end += 1
+        runs.append((4 * cells[k], (1 << (4 * (end - k))) - 1, 4 * k))
+        k = end
+    return runs
+
+
+def compile_tuple(cells):
+    """
+    How to read the index of a tuple from a board: (transposed, runs).
+    Columns are read from the transposed board, where they are rows.
+    """
+    transposed_cells = [4 * (c % 4) + c // 4 for c in cells]
+    runs = _runs(cells)
+    transposed_runs = _runs(transposed_cells)
+    if len(transposed_runs) < len(runs):
+        return True, transposed_runs
+    return False, runs
+
+
+class NTupleNetwork:
+    # the tuples do not share weights across rotations and reflections
+    symmetric = False
+
+    def __init__(self, tuples=DEFAULT_TUPLES, weights=None):
+        self.tuples = [tuple(cells) for cells in tuples]
+        length = len(self.tuples[0])
+        if any(len(cells) != length for cells in self.tuples):
+            raise ValueError("every tuple must have the same number of cells")
+        shape = (len(self.tuples), 16 ** length)
+        if weights is None:
+            weights = np.zeros(shape, dtype=np.float32)
+        elif weights.shape != shape or weights.dtype != np.float32:
+            raise ValueError(f"weights must be a float32 array of shape {shape}")
+        self.weights = weights
+        self._compiled = [compile_tuple(cells) for cells in self.tuples]
+        # memoryviews index much faster than arrays for one lookup at a time
+        # and, unlike tolist(), do not copy the (possibly mapped) weights.
+        # Tuples read in one or two runs (rows, columns, squares) get
+        # unrolled loops in evaluate()
+        self._one_run = []
+        self._two_runs = []
+        self._other = []
+        for table, (transposed, runs) in zip(self.weights, self._compiled):
+            table = memoryview(table)
+            if len(runs) == 1:
+                self._one_run.append((table, transposed) + runs[0][:2])
+            elif len(runs) == 2:
+                self._two_runs.append((table, transposed) + runs[0] + runs[1])
+            else:
+                self._other.append((table, transposed, runs))
+
+    @classmethod
+    def load(cls, path, tuples=DEFAULT_TUPLES, writable=False):
+        """Memory-map the weights saved at path (read-only unless writable)."""
+        return cls(tuples, np.load(path, mmap_mode='r+' if writable else 'r'))
+
+    def save(self, path):
+        np.save(path, self.weights)
+
+    def evaluate(self, board):
+        """Score a single bitboard."""
+        cols = bitboard.transpose(board)
+        total = 0.0
+        for table, transposed, shift, mask in self._one_run:
+            total += table[((cols if transposed else board) >> shift) & mask]
+        for table, transposed, shift1, mask1, out1, shift2, mask2, out2 in self._two_runs:
+            source = cols if transposed else board
+            total += table[((source >> shift1) & mask1) << out1
+                           | ((source >> shift2) & mask2) << out2]
+        for table, transposed, runs in self._other:
+            source = cols if transposed else board
+            index = 0
+            for shift, mask, out in runs:
+                index |= ((source >> shift) & mask) << out
+            total += table[index]
+        return total
+
+    def indices_many(self, boards):
+        """Index of every tuple for every board, an intp array of shape (tuples, boards)."""
+        boards = np.asarray(boards, dtype=np.uint64)
+        cols = transpose_many(boards)
+        indices = np.zeros((len(self.tuples), len(boards)), dtype=np.uint64)
+        for t, (transposed, runs) in enumerate(self._compiled):
+            source = cols if transposed else boards
+            for shift, mask, out in runs:
+                indices[t] |= ((source >> np.uint64(shift)) & np.uint64(mask)) << np.uint64(out)
+        return indices.astype(np.intp)
+
+    def evaluate_many(self, boards):
+        """Score a sequence of bitboards, returning a float64 array."""
+        indices = self.indices_many(boards)
+        scores = np.zeros(indices.shape[1], dtype=np.float64)
+        for table, index in zip(self.weights, indices):
+            scores += table[index]
+        return scores
@@ -0,0 +1,168 @@
+"""
+Opening book: precomputed best moves for the early positions of a game.
+
+The builder starts from every possible new game. It solves each position
+with a GameAI search, then follows the chosen move through every spawn,
+going ply by ply. Positions are kept only while they are at least
+min_probability likely, so the book covers the positions that actually come
+up when the AI plays from the start. Positions are stored by their
+canonical symmetric board (symmetry.py), so one entry answers all eight
+orientations.
+
+The book file is a small header, then the sorted canonical keys (uint64),
+then one move code (uint8) per key. OpeningBook memory-maps both arrays, and
+a lookup is one canonicalization and a binary search.
+"""
+import argparse
+import os
+import struct
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import bitboard
+import symmetry
+from ai_logic import GameAI
+
+MAGIC = b"2048BOOK"
+HEADER = struct.Struct("<8sQ")
+MOVE_NAMES = [name for name, _ in bitboard.MOVES]
+
+DEFAULT_BOOK = "opening_book.bin"
+DEFAULT_PLIES = 6
+DEFAULT_MIN_PROBABILITY = 1e-5
+DEFAULT_DEPTH = 4
+
+
+class OpeningBook:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an opening book")
+        if count:
+            self.keys = np.memmap(path, dtype="<u8", mode="r", offset=HEADER.size, shape=(count,))
+            self.moves = np.memmap(path, dtype=np.uint8, mode="r",
+                                   offset=HEADER.size + 8 * count, shape=(count,))
+        else:
+            # mmap refuses empty ranges
+            self.keys = np.zeros(0, dtype="<u8")
+            self.moves = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, board):
+        """Book move for bitboard board, or None if it is not in the book."""
+        key, transform = symmetry.canonical_with_transform(board)
+        i = int(np.searchsorted(self.keys, key))
+        if i == len(self.keys) or int(self.keys[i]) != key:
+            return None
+        return symmetry.move_from_canonical(MOVE_NAMES[self.moves[i]], transform)
+
+
+def write_book(path, entries):
+    """Write {canonical board: move name} to path."""
+    keys = np.array(sorted(entries), dtype="<u8")
+    moves = np.array([MOVE_NAMES.index(entries[int(key)]) for key in keys], dtype=np.uint8)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys)))
+        f.write(keys.tobytes())
+        f.write(moves.tobytes())
+
+
+def spawns(board):
+    # every board a spawn can produce, with its probability
+    empty_tiles = bitboard.empty_positions(board)
+    for k in empty_tiles:
+        yield board | (1 << (4 * k)), 0.9 / len(empty_tiles)
+        yield board | (2 << (4 * k)), 0.1 / len(empty_tiles)
+
+
+def start_positions():
+    """{canonical board: probability} over every board logic.new_game can deal."""
+    positions = defaultdict(float)
+    for first, p in spawns(0):
+        for board, q in spawns(first):
+            positions[symmetry.canonical(board)] += p * q
+    return positions
+
+
+_solver = None
+
+
+def _init_solver(ai_options):
+    global _solver
+    _solver = GameAI(**ai_options)
+
+
+def _solve(keys, depth):
+    moves = []
+    for key in keys:
+        if _solver.transposition_table is not None:
+            _solver.transposition_table.new_search()
+        moves.append(_solver.search_root(key, depth)[0])
+    return moves
+
+
+def build_book(plies=DEFAULT_PLIES, min_probability=DEFAULT_MIN_PROBABILITY,
+               depth=DEFAULT_DEPTH, num_workers=4, ai_options=None, on_ply=None):
+    """
+    Solve every position reachable in up to plies moves from a new game with
+    at least min_probability, and return {canonical board: move name}.
+    """
+    ai_options = dict(ai_options or {'algorithm': 'expectimax'})
+    entries = {}
+    level = start_positions()
+    with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_solver,
+                             initargs=(ai_options,)) as executor:
+        for ply in range(plies + 1):
+            start = time.perf_counter()
+            keys = [key for key in level if key not in entries]
+            chunk = max(1, len(keys) // (num_workers * 4))
+            chunks = [keys[i:i + chunk] for i in range(0, len(keys), chunk)]
+            for part, moves in zip(chunks, executor.map(_solve, chunks, [depth] * len(chunks))):
+                for key, move in zip(part, moves):
+                    if move is not None:
+                        entries[key] = move
+            if on_ply:
+                on_ply(ply, len(keys), time.perf_counter() - start)
+            if ply == plies:
+                break
+
+            # follow the book move through every spawn
+            next_level = defaultdict(float)
+            for key, probability in level.items():
+                move = entries.get(key)
+                if move is None:
+                    continue
+                for board, p in spawns(bitboard.MOVE_FUNCS[move](key)):
+                    if probability * p >= min_probability:
+                        next_level[symmetry.canonical(board)] += probability * p
+            level = next_level
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the opening book.")
+    parser.add_argument("--output", default=DEFAULT_BOOK)
+    parser.add_argument("--plies", type=int, default=DEFAULT_PLIES)
+    parser.add_argument("--min-probability", type=float, default=DEFAULT_MIN_PROBABILITY)
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH, help="search depth per position")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    args = parser.parse_args(argv)
+
+    def on_ply(ply, positions, seconds):
+        print(f"ply {ply}: solved {positions} positions in {seconds:.1f}s")
+
+    entries = build_book(args.plies, args.min_probability, args.depth,
+                         args.workers, on_ply=on_ply)
+    write_book(args.output, entries)
+    print(f"{len(entries)} positions written to {args.output} "
+          f"({os.path.getsize(args.output) / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Root-parallel search for GameAI.
+
+The subtrees under the four root moves are independent, so each legal move
+is scored in its own task on a process pool that lives for the whole
+program. With parallel_chance the first chance layer of expectimax is split
+as well: one task per spawn (empty cell and 2/4 tile). The parent combines
+their scores with the spawn probabilities.
+
+Scores are merged in the root move order, and minimax gives every root move
+its own spawn seed (GameAI.root_move_seeds), so the chosen move matches a
+serial search with the same settings. Only the transposition tables differ:
+each worker has its own, and an entry from a deeper search can stand in for
+a shallower one, so with a table near-equal moves can still swap places.
+
+Every search gets an id, shared with the workers through shared memory.
+When the parent gives up on a search (time budget or should_stop), it
+cancels the tasks that have not started and changes the id. Tasks already
+running see the new id at their next search node and stop, so they do not
+keep the pool busy for the next search.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import bitboard
+from ai_logic import GameAI, SearchCancelled
+
+# how often (s) the parent checks should_stop while waiting on the pool
+STOP_CHECK_INTERVAL = 0.01
+
+_pool = None
+_pool_workers = 0
+# id of the search the pool works for, a multiprocessing.RawValue shared with
+# the workers (each worker gets it from _init_worker)
+_search_id = None
+
+# per-worker searchers keyed by their options, kept warm across tasks
+_worker_ais = {}
+
+
+def get_pool(workers):
+    global _pool, _pool_workers, _search_id
+    if _pool is None or _pool_workers != workers:
+        shutdown_pool()
+        _search_id = multiprocessing.RawValue('Q', 0)
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                    initargs=(_search_id,))
+        _pool_workers = workers
+    return _pool
+
+
+def _init_worker(search_id):
+    global _search_id
+    _search_id = search_id
+
+
+def shutdown_pool():
+    global _pool, _pool_workers
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+    _pool = None
+    _pool_workers = 0
+
+
+def _worker_ai(options):
+    key = tuple(sorted(options.items()))
+    ai = _worker_ais.get(key)
+    if ai is None:
+        ai = _worker_ais[key] = GameAI(**options)
+    return ai
+
+
+def _task_ai(options, search_id):
+    ai = _worker_ai(options)
+    # raises SearchCancelled at the next node once the parent moved on
+    ai._should_stop = lambda: _search_id.value != search_id
+    return ai
+
+
+def _score_move_task(options, search_id, new_board, depth, seed):
+    ai = _task_ai(options, search_id)
+    if ai.transposition_table is not None:
+        ai.transposition_table.new_search()
+    try:
+        return ai.score_move(new_board, depth, seed)
+    finally:
+        ai._should_stop = None
+
+
+def _score_spawn_task(options, search_id, spawned_board, depth, probability):
+    ai = _task_ai(options, search_id)
+    try:
+        return ai.expectimax_max(spawned_board, depth, probability)
+    finally:
+        ai._should_stop = None
+
+
+def score_root_moves(ai, board, depth, rng=None, moves=bitboard.MOVES):
+    """Score every legal root move of board on the pool, returns {move: score}."""
+    pool = get_pool(ai.parallel_workers)
+    _search_id.value += 1
+    search_id = _search_id.value
+    split_chance = ai.parallel_chance and ai.algorithm == 'expectimax' and depth > 0
+
+    # move name -> list of (weight, future)
+    tasks = {}
+    legal = dict(bitboard.legal_moves(board))
+    seeds = ai.root_move_seeds(legal, rng)
+    for move_name, move_func in moves:
+        if move_name not in legal:
+            continue
+        new_board = legal[move_name]
+        if split_chance and not bitboard.is_win(new_board):
+            empty_tiles = bitboard.empty_positions(new_board)
+            cell_probability = 1.0 / len(empty_tiles)
+            tasks[move_name] = [
+                (cell_probability * tile_probability, pool.submit(
+                    _score_spawn_task, ai.options, search_id,
+                    new_board | (exponent << (4 * k)),
+                    depth - 1, cell_probability * tile_probability
+                ))
+                for k in empty_tiles
+                for exponent, tile_probability in ((1, 0.9), (2, 0.1))
+            ]
+        else:
+            tasks[move_name] = [(1.0, pool.submit(
+                _score_move_task, ai.options, search_id, new_board, depth, seeds[move_name]
+            ))]
+
+    pending = {future for parts in tasks.values() for _, future in parts}
+    while pending:
+        _, pending = wait(pending, timeout=STOP_CHECK_INTERVAL)
+        if ai._should_stop is not None and ai._should_stop():
+            for future in pending:
+                future.cancel()
+            # the tasks already running stop at their next node
+            _search_id.value += 1
+            raise SearchCancelled()
+
+    return {
+        move_name: sum(weight * future.result() for weight, future in parts)
+        for move_name, parts in tasks.items()
+    }
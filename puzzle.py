@@ -1,11 +1,9 @@
 from tkinter import Frame, Label, CENTER, messagebox, Button
-import random
 import logic
 import constants as c
 from ai_logic import GameAI
-
-def gen():
-    return random.randint(0, c.GRID_LEN - 1)
+from background_search import BackgroundSearch
+from history import GameHistory
 
 class GameGrid(Frame):
     def __init__(self):
@@ -69,27 +67,34 @@ class GameGrid(Frame):
         self.master.title('2048')
         self.master.bind("<Key>", self.key_down)
 
+        # key -> move name, played through logic.MOVES
         self.commands = {
-            c.KEY_UP: logic.up,
-            c.KEY_DOWN: logic.down,
-            c.KEY_LEFT: logic.left,
-            c.KEY_RIGHT: logic.right,
-            c.KEY_UP_ALT1: logic.up,
-            c.KEY_DOWN_ALT1: logic.down,
-            c.KEY_LEFT_ALT1: logic.left,
-            c.KEY_RIGHT_ALT1: logic.right,
-            c.KEY_UP_ALT2: logic.up,
-            c.KEY_DOWN_ALT2: logic.down,
-            c.KEY_LEFT_ALT2: logic.left,
-            c.KEY_RIGHT_ALT2: logic.right,
+            c.KEY_UP: 'up',
+            c.KEY_DOWN: 'down',
+            c.KEY_LEFT: 'left',
+            c.KEY_RIGHT: 'right',
+            c.KEY_UP_ALT1: 'up',
+            c.KEY_DOWN_ALT1: 'down',
+            c.KEY_LEFT_ALT1: 'left',
+            c.KEY_RIGHT_ALT1: 'right',
+            c.KEY_UP_ALT2: 'up',
+            c.KEY_DOWN_ALT2: 'down',
+            c.KEY_LEFT_ALT2: 'left',
+            c.KEY_RIGHT_ALT2: 'right',
         }
 
         self.grid_cells = []
         self.init_grid()
         self.matrix = logic.new_game(c.GRID_LEN)
-        self.history_matrixs = []
+        # packed boards for undo/redo, the current board is the last one recorded
+        self.history = GameHistory(c.HISTORY_CAP)
+        self.history.reset(self.matrix)
         self.score = 0
         self.ai = GameAI()  # Initialize the AI
+        # AI searches run off the Tk thread, results are polled with after()
+        self.search = BackgroundSearch(self.ai)
+        self.search_ticket = None
+        self.search_purpose = None
         self.hint_mode = False  # track  hint mode
         self.auto_play_mode = False  # track play mode
         self.update_grid_cells()
@@ -97,8 +102,6 @@ class GameGrid(Frame):
         # Initial AI hint
         self.update_hint()
 
-        self.mainloop()
-
 
     def toggle_hint(self): 
         self.hint_mode = not self.hint_mode
@@ -109,6 +112,8 @@ class GameGrid(Frame):
         else:
             self.ai_hint_button.configure(text="Show AI Hint")
             self.hint_label.configure(text="")
+            if self.search_purpose == 'hint':
+                self.cancel_search()
 
 
     def toggle_autoplay(self):
@@ -124,17 +129,51 @@ class GameGrid(Frame):
         else:
             self.auto_play_button.configure(text="Start Auto Play")
             self.hint_label.configure(text="")
+            if self.search_purpose == 'autoplay':
+                self.cancel_search()
+
+    def start_search(self, purpose):
+        """Search the current board in the background, replacing any running search"""
+        self.search_ticket = self.search.submit(self.matrix)
+        self.search_purpose = purpose
+        self.master.after(c.AI_POLL_INTERVAL, self.poll_search, self.search_ticket)
+
+    def cancel_search(self):
+        self.search.cancel()
+        self.search_ticket = None
+        self.search_purpose = None
+
+    def poll_search(self, ticket):
+        # a newer search (or a cancel) owns the polling now
+        if ticket != self.search_ticket:
+            return
+        result = self.search.poll()
+        if result is None:
+            self.master.after(c.AI_POLL_INTERVAL, self.poll_search, ticket)
+            return
+
+        purpose = self.search_purpose
+        self.search_ticket = None
+        self.search_purpose = None
+        best_move = result[1]
+        if purpose == 'hint':
+            self.show_hint(best_move)
+        elif purpose == 'autoplay':
+            self.apply_ai_move(best_move)
 
     def update_hint(self):
-        if self.hint_mode:
-            # Get best move
-            best_move = self.ai.get_best_move(self.matrix)
-            
-            if best_move:
-                # Update hint label
-                self.hint_label.configure(text=f"Recommended Move: {best_move.capitalize()}")
-            else:
-                self.hint_label.configure(text="No recommended move")
+        # autoplay keeps its own search running and labels every move it plays,
+        # a hint search would replace it and stall autoplay
+        if self.hint_mode and not self.auto_play_mode:
+            self.hint_label.configure(text="Thinking...")
+            self.start_search('hint')
+
+    def show_hint(self, best_move):
+        if best_move:
+            # Update hint label
+            self.hint_label.configure(text=f"Recommended Move: {best_move.capitalize()}")
+        else:
+            self.hint_label.configure(text="No recommended move")
 
 
     def run_autoplay(self):
@@ -142,24 +181,21 @@ class GameGrid(Frame):
         if not self.auto_play_mode:
             return
 
-        # Get best move
-        best_move = self.ai.get_best_move(self.matrix)
-        
+        # the move is played by apply_ai_move once the background search finishes
+        self.start_search('autoplay')
+
+    def apply_ai_move(self, best_move):
+        if not self.auto_play_mode:
+            return
+
         if best_move:
             # Execute the move
-            if best_move == 'up':
-                self.matrix, done = logic.up(self.matrix)
-            elif best_move == 'down':
-                self.matrix, done = logic.down(self.matrix)
-            elif best_move == 'left':
-                self.matrix, done = logic.left(self.matrix)
-            elif best_move == 'right':
-                self.matrix, done = logic.right(self.matrix)
+            self.matrix, done = logic.MOVES[best_move](self.matrix)
             
             # Add a new tile if move was successful
             if done:
                 self.matrix = logic.add_random_tile(self.matrix)
-                self.history_matrixs.append(self.matrix)
+                self.history.push(self.matrix, best_move)
                 self.update_grid_cells()
                 
                 # Update hint label
@@ -175,10 +211,13 @@ class GameGrid(Frame):
                     messagebox.showinfo("Game Over", "You Lose!")
                     self.auto_play_mode = False
                     self.auto_play_button.configure(text="Start AI Play")
-        
-        # Schedule next move if AI play mode is still on
+        else:
+            self.auto_play_mode = False
+            self.auto_play_button.configure(text="Start AI Play")
+
+        # Start the next search as soon as this move is on screen
         if self.auto_play_mode:
-            self.master.after(100, self.run_autoplay)  # 100ms delay between moves
+            self.master.after_idle(self.run_autoplay)
 
 
     def init_grid(self):
@@ -244,39 +283,50 @@ class GameGrid(Frame):
         
         if key == c.KEY_QUIT: 
             self.quit()
-        if key == c.KEY_BACK and len(self.history_matrixs) > 1:
-            self.matrix = self.history_matrixs.pop()
-            self.update_grid_cells()
-            print('back on step total step:', len(self.history_matrixs))
-            # update hint after going back
-            self.update_hint()
+        if key in (c.KEY_BACK, c.KEY_REDO):
+            if key == c.KEY_BACK:
+                matrix = self.history.undo()
+            else:
+                matrix = self.history.redo()
+            if matrix is not None:
+                # any running search is for a board that is gone now
+                self.cancel_search()
+                self.matrix = matrix
+                self.update_grid_cells()
+                print('history step:', len(self.history))
+                # update hint after going back
+                self.update_hint()
         elif key in self.commands:
-            self.matrix, done = self.commands[key](self.matrix)
+            move = self.commands[key]
+            self.matrix, done = logic.MOVES[move](self.matrix)
             if done:
+                self.cancel_search()
                 self.matrix = logic.add_random_tile(self.matrix)
                 # record last move
-                self.history_matrixs.append(self.matrix)
+                self.history.push(self.matrix, move)
                 self.update_grid_cells()
                 
                 # update hint after move
                 self.update_hint()
                 
-                if logic.game_state(self.matrix) == 'win':
+                game_status = logic.game_state(self.matrix)
+                if game_status == 'win':
                     messagebox.showinfo("Congratulations!", "You Win!")
                     self.quit()
-                if logic.game_state(self.matrix) == 'lose':
+                if game_status == 'lose':
                     messagebox.showinfo("Game Over", "You Lose!")
                     self.quit()
 
     def generate_next(self):
-        index = (gen(), gen())
-        while self.matrix[index[0]][index[1]] != 0:
-            index = (gen(), gen())
-        self.matrix[index[0]][index[1]] = 2
+        # same spawn path as the game logic and the simulator
+        self.matrix = logic.add_random_tile(self.matrix)
         
     def reset_game(self):
+        self.cancel_search()
         # Reset the game matrix
         self.matrix = logic.new_game(c.GRID_LEN)
+        self.history.reset(self.matrix)
+        self.ai.new_game()
     
         # Update the grid display manually
         for i in range(c.GRID_LEN):
@@ -290,5 +340,9 @@ class GameGrid(Frame):
         # Reset the score
         self.score = 0
         self.score_label.config(text=f"Score: {self.score}")
+        self.update_hint()
+        # restarting cancelled the autoplay search, keep playing on the new board
+        self.run_autoplay()
 
-game_grid = GameGrid()
\ No newline at end of file
+if __name__ == "__main__":
+    GameGrid().mainloop()
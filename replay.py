@@ -0,0 +1,167 @@
+"""
+Compact binary game replays.
+
+A replay file is a 16-byte header followed by fixed 10-byte records, one per
+step:
+
+    board   uint64  the bitboard before the move
+    move    uint8   index into MOVE_NAMES, or GAME_END for a game's final board
+    spawn   uint8   cell index (low nibble) and exponent (high nibble) of the
+                    tile spawned after the move, 0 for the GAME_END record
+
+A file holds any number of games back to back, each closed by its GAME_END
+record. ReplayWriter appends records as a game is played. ReplayReader
+memory-maps the file as a NumPy record array, so it can scan millions of
+steps for statistics without loading them. It can also replay a game move by
+move and check every step against the stored boards.
+"""
+import os
+import struct
+import sys
+from collections import Counter
+
+import numpy as np
+
+import bitboard
+
+MAGIC = b"2048RPL\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+RECORD = struct.Struct("<QBB")
+RECORD_DTYPE = np.dtype([("board", "<u8"), ("move", "u1"), ("spawn", "u1")])
+
+MOVE_NAMES = [name for name, _ in bitboard.MOVES]
+GAME_END = 255
+
+
+def spawn_code(moved, spawned):
+    """Encode the tile added to bitboard moved to give bitboard spawned."""
+    diff = moved ^ spawned
+    cell = (diff.bit_length() - 1) // 4
+    return cell | (diff >> (4 * cell)) << 4
+
+
+def apply_spawn(board, code):
+    return board | (code >> 4) << (4 * (code & 0xF))
+
+
+class ReplayWriter:
+    """Streams replay records to path. Use as a context manager or call close()."""
+
+    def __init__(self, path):
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self._move_codes = {name: code for code, name in enumerate(MOVE_NAMES)}
+        self.steps = 0
+        self.games = 0
+
+    def write_step(self, board, move, moved, spawned):
+        """Record that move took bitboard board to moved, then the spawn gave spawned."""
+        self._file.write(RECORD.pack(board, self._move_codes[move], spawn_code(moved, spawned)))
+        self.steps += 1
+
+    def end_game(self, board):
+        self._file.write(RECORD.pack(board, GAME_END, 0))
+        self.games += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReplayReader:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic, version, record_size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise ValueError(f"{path} is not a version {VERSION} replay file")
+        if os.path.getsize(path) > HEADER.size:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size)
+        else:
+            # mmap refuses empty ranges
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        # index of every game's GAME_END record; games run from one end to the next
+        self._ends = np.flatnonzero(self.records["move"] == GAME_END)
+
+    def __len__(self):
+        return len(self._ends)
+
+    @property
+    def steps(self):
+        return len(self.records) - len(self._ends)
+
+    def game_records(self, index):
+        start = self._ends[index - 1] + 1 if index > 0 else 0
+        return self.records[start:self._ends[index] + 1]
+
+    def replay(self, index):
+        """
+        Play game index again from its first board and yield (move, board) per
+        step, ending with (None, final board). Raises ValueError if a stored
+        board does not follow from the previous step.
+        """
+        records = self.game_records(index)
+        board = int(records[0]["board"])
+        for record in records:
+            stored = int(record["board"])
+            if stored != board:
+                raise ValueError(f"game {index}: replayed board does not match the file")
+            if record["move"] == GAME_END:
+                yield None, board
+                return
+            move = MOVE_NAMES[record["move"]]
+            yield move, board
+            board = apply_spawn(bitboard.MOVE_FUNCS[move](board), int(record["spawn"]))
+
+    def max_exponents(self):
+        # largest exponent on every stored board, vectorized over the nibbles
+        boards = self.records["board"]
+        result = np.zeros(len(boards), dtype=np.uint8)
+        for shift in range(0, 64, 4):
+            np.maximum(result, (boards >> np.uint64(shift)) & np.uint64(0xF), out=result,
+                       casting="unsafe")
+        return result
+
+    def move_distribution(self):
+        """{max tile on the board: Counter of moves played} over every step."""
+        moves = self.records["move"]
+        steps = moves != GAME_END
+        stages = self.max_exponents()[steps].astype(np.intp)
+        counts = np.bincount(stages * len(MOVE_NAMES) + moves[steps],
+                             minlength=(bitboard.MAX_EXPONENT + 1) * len(MOVE_NAMES))
+        counts = counts.reshape(-1, len(MOVE_NAMES))
+        return {
+            1 << stage: Counter({name: int(n) for name, n in zip(MOVE_NAMES, row) if n})
+            for stage, row in enumerate(counts) if row.any()
+        }
+
+    def final_max_tiles(self):
+        """Counter of the largest tile each game ended with."""
+        finals = self.max_exponents()[self._ends]
+        return Counter(1 << int(e) for e in finals)
+
+
+def print_report(reader):
+    print(f"Games: {len(reader)}, steps: {reader.steps}")
+    print("\n--- Final Max Tile ---")
+    for tile, count in sorted(reader.final_max_tiles().items()):
+        print(f"Tile {tile}: {count} games")
+    print("\n--- Moves By Stage (max tile on board) ---")
+    for tile, moves in sorted(reader.move_distribution().items()):
+        total = sum(moves.values())
+        shares = ", ".join(f"{name} {moves[name] / total:.0%}" for name in MOVE_NAMES)
+        print(f"{tile:>6}: {total:>8} steps  {shares}")
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        print(f"== {path}")
+        print_report(ReplayReader(path))
@@ -0,0 +1,141 @@
+"""
+Optional instrumentation for GameAI searches.
+
+Attach a SearchStats to a GameAI (GameAI(stats=SearchStats()) or ai.stats =
+...) and every get_best_move call records where its work went. Without one
+the search only pays a None check per node.
+
+Stats from many games or processes are combined with merge(), and to_dict()
+/ from_dict() turn them into plain JSON-friendly dicts to cross process
+boundaries.
+"""
+from collections import Counter
+
+# upper bounds (ms) of the per-call latency histogram buckets, the last one is open
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class SearchStats:
+    def __init__(self):
+        # nodes visited, keyed by the remaining search depth of the node
+        self.nodes_by_depth = Counter()
+        self.evaluations = 0
+        # nodes whose children were generated and how many children they had
+        self.expanded = 0
+        self.children = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.depth_counts = Counter()
+
+    # hooks called by the search
+
+    def node(self, depth, count=1):
+        self.nodes_by_depth[depth] += count
+
+    def expand(self, children):
+        self.expanded += 1
+        self.children += children
+
+    def evaluated(self, count=1):
+        self.evaluations += count
+
+    def record_call(self, seconds, depth, cache_hits=0, cache_misses=0):
+        self.calls += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.depth_counts[depth] += 1
+        self.cache_hits += cache_hits
+        self.cache_misses += cache_misses
+        milliseconds = seconds * 1000
+        bucket = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if milliseconds <= bound:
+                bucket = i
+                break
+        self.latency_histogram[bucket] += 1
+
+    # derived numbers
+
+    @property
+    def nodes(self):
+        return sum(self.nodes_by_depth.values())
+
+    @property
+    def branching_factor(self):
+        return self.children / self.expanded if self.expanded else 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.total_seconds if self.total_seconds else 0.0
+
+    # aggregation
+
+    def merge(self, other):
+        self.nodes_by_depth.update(other.nodes_by_depth)
+        self.evaluations += other.evaluations
+        self.expanded += other.expanded
+        self.children += other.children
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+        self.calls += other.calls
+        self.total_seconds += other.total_seconds
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+        self.depth_counts.update(other.depth_counts)
+        self.latency_histogram = [
+            a + b for a, b in zip(self.latency_histogram, other.latency_histogram)
+        ]
+        return self
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "nodes": self.nodes,
+            "nodes_by_depth": {str(d): n for d, n in sorted(self.nodes_by_depth.items())},
+            "evaluations": self.evaluations,
+            "expanded": self.expanded,
+            "children": self.children,
+            "branching_factor": self.branching_factor,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "total_seconds": self.total_seconds,
+            "max_seconds": self.max_seconds,
+            "nodes_per_second": self.nodes_per_second,
+            "depth_counts": {str(d): n for d, n in sorted(self.depth_counts.items())},
+            "latency_histogram": list(self.latency_histogram),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.nodes_by_depth = Counter({int(d): n for d, n in data["nodes_by_depth"].items()})
+        stats.evaluations = data["evaluations"]
+        stats.expanded = data["expanded"]
+        stats.children = data["children"]
+        stats.cache_hits = data["cache_hits"]
+        stats.cache_misses = data["cache_misses"]
+        stats.calls = data["calls"]
+        stats.total_seconds = data["total_seconds"]
+        stats.max_seconds = data["max_seconds"]
+        stats.depth_counts = Counter({int(d): n for d, n in data["depth_counts"].items()})
+        stats.latency_histogram = list(data["latency_histogram"])
+        return stats
+
+    def report(self):
+        """Multi-line human readable summary."""
+        lines = [
+            f"get_best_move calls: {self.calls}",
+            f"wall time: {self.total_seconds:.2f}s total, "
+            f"{self.total_seconds / self.calls * 1000 if self.calls else 0.0:.1f}ms mean, "
+            f"{self.max_seconds * 1000:.1f}ms max",
+            f"nodes: {self.nodes} ({self.nodes_per_second:.0f}/s), "
+            f"evaluations: {self.evaluations}, branching factor: {self.branching_factor:.2f}",
+            f"cache hits: {self.cache_hits}, misses: {self.cache_misses}",
+            "nodes by remaining depth: " + ", ".join(
+                f"{d}: {n}" for d, n in sorted(self.nodes_by_depth.items(), reverse=True)
+            ),
+        ]
+        return "\n".join(lines)
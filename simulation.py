@@ -0,0 +1,168 @@
+"""
+Batch simulation engine for running many AI games.
+
+Games are sharded into chunks and each worker process builds its GameAI once
+(in the pool initializer), so its evaluator tables and transposition table
+are built once for every game the worker plays and its cached scores stay
+warm from one game to the next. Every game gets a deterministic seed derived
+from the batch seed and its game id; with deterministic=True the AI is also
+reset (GameAI.new_game) before every game, so a game's result does not
+depend on the chunking either. Results are streamed to a JSON lines
+file as chunks complete. With replay_dir every chunk also streams its games
+to a binary replay file there (see replay.py).
+"""
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ai_logic import GameAI
+from search_stats import SearchStats
+from test_parallel import simulate_game
+
+# per-process AI, created once by _init_worker
+_worker_ai = None
+
+
+def game_seed(seed, game_id):
+    # distinct, reproducible seed for every (batch seed, game) pair
+    return seed * 1_000_003 + game_id
+
+
+def _init_worker(ai_options):
+    global _worker_ai
+    _worker_ai = GameAI(**ai_options)
+
+
+def replay_path(replay_dir, game_ids):
+    return os.path.join(replay_dir, f"games-{game_ids[0]:06d}-{game_ids[-1]:06d}.rpl")
+
+
+def _run_chunk(game_ids, seed, collect_stats=False, replay_dir=None, deterministic=False):
+    results = []
+    replay = None
+    if replay_dir:
+        # replay.py pulls in numpy for its reader, so only load it when recording
+        from replay import ReplayWriter
+        replay = ReplayWriter(replay_path(replay_dir, game_ids))
+    try:
+        for game_id in game_ids:
+            start = time.perf_counter()
+            result = simulate_game(
+                game_id, ai=_worker_ai,
+                seed=None if seed is None else game_seed(seed, game_id),
+                collect_stats=collect_stats, replay=replay, deterministic=deterministic
+            )
+            result["seconds"] = time.perf_counter() - start
+            results.append(result)
+    finally:
+        if replay is not None:
+            replay.close()
+    return results
+
+
+def make_chunks(num_games, chunk_size):
+    game_ids = list(range(1, num_games + 1))
+    return [game_ids[i:i + chunk_size] for i in range(0, num_games, chunk_size)]
+
+
+def run_batch(num_games, num_workers=4, chunk_size=None, seed=None,
+              output=None, ai_options=None, on_result=None, collect_stats=False,
+              replay_dir=None, deterministic=False):
+    """
+    Play num_games games across num_workers processes and return a summary.
+
+    Each result is written as one JSON line to output (a path) as soon as its
+    chunk finishes, and passed to on_result if given. With collect_stats the
+    summary also aggregates every game's search statistics. With replay_dir
+    every step of every game is recorded there, one replay file per chunk.
+    With deterministic every game starts from a reset AI, see simulate_game.
+    A chunk that raises is reported and skipped, the other chunks still run.
+    """
+    if chunk_size is None:
+        # a few chunks per worker keeps the load balanced without per-game overhead
+        chunk_size = max(1, num_games // (num_workers * 4))
+    ai_options = ai_options or {}
+    if replay_dir:
+        os.makedirs(replay_dir, exist_ok=True)
+    # load the heuristic tables, and numpy for batched leaf scoring, once here
+    # so forked workers inherit them instead of each loading them again
+    import numpy  # noqa: F401
+    import heuristics
+    heuristics.row_features()
+
+    results = []
+    out = open(output, "w") if output else None
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                 initargs=(ai_options,)) as executor:
+            future_to_chunk = {
+                executor.submit(_run_chunk, chunk, seed, collect_stats, replay_dir,
+                                deterministic): chunk
+                for chunk in make_chunks(num_games, chunk_size)
+            }
+            for future in as_completed(future_to_chunk):
+                chunk = future_to_chunk[future]
+                try:
+                    chunk_results = future.result()
+                except Exception as e:
+                    print(f"Games {chunk[0]}-{chunk[-1]} generated an exception: {e}")
+                    continue
+                for result in chunk_results:
+                    results.append(result)
+                    if out:
+                        out.write(json.dumps(result) + "\n")
+                    if on_result:
+                        on_result(result)
+                if out:
+                    out.flush()
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - start
+    summary = summarize(results, elapsed)
+    if collect_stats:
+        search_stats = SearchStats()
+        for result in results:
+            search_stats.merge(SearchStats.from_dict(result["search_stats"]))
+        summary["search_stats"] = search_stats.to_dict()
+    return summary
+
+
+def summarize(results, elapsed):
+    total_moves = sum(r["moves"] for r in results)
+    return {
+        "games": len(results),
+        "wins": sum(1 for r in results if r["result"] == "win"),
+        "losses": sum(1 for r in results if r["result"] != "win"),
+        "moves": total_moves,
+        "seconds": elapsed,
+        "games_per_second": len(results) / elapsed if elapsed else 0.0,
+        "moves_per_second": total_moves / elapsed if elapsed else 0.0,
+        "max_tile_counts": dict(sorted(Counter(r["max_tile"] for r in results).items())),
+    }
+
+
+def print_summary(summary):
+    print("\n--- Simulation Results ---")
+    print(f"Total games: {summary['games']}")
+    print(f"Wins: {summary['wins']}")
+    print(f"Losses: {summary['losses']}")
+    print(f"Elapsed: {summary['seconds']:.1f}s")
+    print(f"Throughput: {summary['games_per_second']:.2f} games/s, "
+          f"{summary['moves_per_second']:.1f} moves/s")
+    print("\n--- Max Tile Occurrences ---")
+    for tile, count in summary["max_tile_counts"].items():
+        print(f"Tile {tile}: {count} occurrences")
+    if "search_stats" in summary:
+        print("\n--- Search Statistics ---")
+        print(SearchStats.from_dict(summary["search_stats"]).report())
+
+
+if __name__ == "__main__":
+    num_games = 100  # Number of simulations to run
+    num_workers = 4  # Number of worker processes
+    summary = run_batch(num_games, num_workers, seed=0, output="simulation_results.jsonl")
+    print_summary(summary)
@@ -0,0 +1,92 @@
+"""
+The eight symmetries of the 4x4 board (rotations and reflections).
+
+Every transform is a few mask-and-shift operations on the bitboard. The
+canonical form of a board is the smallest bitboard among its eight images,
+so all symmetric positions share one key. This works for any cache whose
+value does not depend on orientation. GameAI's transposition table uses it
+when the evaluator is symmetric, like the default heuristic.
+
+Moves follow the board through a transform: sliding the transformed board
+in MOVE_MAPS[t][move] gives the transformed result of sliding the original
+board in move. move_from_canonical() goes the other way, mapping a move
+chosen on a canonical board back to the board that was asked about.
+"""
+import bitboard
+from bitboard import transpose
+
+
+def flip_horizontal(board):
+    # mirror every row: cell j <-> cell 3 - j
+    return (
+        (board & 0x000F000F000F000F) << 12
+        | (board & 0x00F000F000F000F0) << 4
+        | (board & 0x0F000F000F000F00) >> 4
+        | (board & 0xF000F000F000F000) >> 12
+    )
+
+
+def flip_vertical(board):
+    # mirror the row order: row i <-> row 3 - i
+    return (
+        (board & 0xFFFF) << 48
+        | (board & 0xFFFF0000) << 16
+        | (board >> 16) & 0xFFFF0000
+        | board >> 48
+    )
+
+
+def transforms(board):
+    """The eight images of board, in the order of MOVE_MAPS."""
+    h = flip_horizontal(board)
+    t = transpose(board)
+    th = flip_horizontal(t)
+    return [
+        board, h, flip_vertical(board), flip_vertical(h),
+        t, th, flip_vertical(t), flip_vertical(th),
+    ]
+
+
+def canonical(board):
+    """Smallest of the eight images of board, shared by all of its symmetries."""
+    return min(transforms(board))
+
+
+def canonical_with_transform(board):
+    """(canonical board, index of the transform that produced it)."""
+    images = transforms(board)
+    key = min(images)
+    return key, images.index(key)
+
+
+def _move_map(flip_h, flip_v, swap_axes):
+    # transpose first (as in transforms()), then the flips
+    swap = {'up': 'left', 'left': 'up', 'down': 'right', 'right': 'down'}
+    mirror_h = {'left': 'right', 'right': 'left'}
+    mirror_v = {'up': 'down', 'down': 'up'}
+    mapping = {}
+    for move, _ in bitboard.MOVES:
+        mapped = swap[move] if swap_axes else move
+        if flip_h:
+            mapped = mirror_h.get(mapped, mapped)
+        if flip_v:
+            mapped = mirror_v.get(mapped, mapped)
+        mapping[move] = mapped
+    return mapping
+
+
+# MOVE_MAPS[t][move]: the move on transforms(board)[t] that matches move on board
+MOVE_MAPS = [
+    _move_map(flip_h, flip_v, swap_axes)
+    for swap_axes in (False, True)
+    for flip_v, flip_h in ((False, False), (False, True), (True, False), (True, True))
+]
+# INVERSE_MOVE_MAPS[t][move]: the move on board that matches move on transforms(board)[t]
+INVERSE_MOVE_MAPS = [
+    {mapped: move for move, mapped in mapping.items()} for mapping in MOVE_MAPS
+]
+
+
+def move_from_canonical(move, transform):
+    """Map a move chosen on a canonical board back to the original orientation."""
+    return INVERSE_MOVE_MAPS[transform][move]
@@ -0,0 +1,236 @@
+"""
+Self-play TD(0) training of n-tuple network weights.
+
+Games are played with test_parallel.simulate_game by an AfterstatePlayer,
+which picks the move with the best merge score plus network value of the
+resulting afterstate (the board after the move, before the spawn) and
+records every afterstate it chose. Each batch of games runs across a process
+pool with the current weights memory-mapped from the checkpoint. The parent
+then applies one batched TD(0) update over all their transitions:
+
+    delta_t = reward_{t+1} + V(afterstate_{t+1}) - V(afterstate_t)
+
+with V = 0 after a game's last afterstate. Each weight moves by the mean
+error of the batch's afterstates that use it, computed with np.bincount over
+each tuple's indices. The checkpoint is
+replaced atomically after every batch, so a training run can be resumed and
+the weights can be used at any time with GameAI(evaluator=checkpoint).
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import bitboard
+from ntuple import NTupleNetwork
+from simulation import game_seed
+from test_parallel import simulate_game
+
+DEFAULT_CHECKPOINT = "ntuple_weights.npy"
+DEFAULT_ALPHA = 0.5
+
+
+class AfterstatePlayer:
+    """Greedy one-ply player over a value network, usable as simulate_game's ai."""
+
+    def __init__(self, network):
+        self.network = network
+        # simulate_game swaps this when collecting search stats
+        self.stats = None
+        self.new_game()
+
+    def new_game(self):
+        # called by _play_chunk before every game
+        self.afterstates = []
+        self.rewards = []
+
+    def get_best_move(self, game, rng=None):
+        board = game.bits if isinstance(game, bitboard.Board) else bitboard.from_matrix(game)
+        best = None
+        best_value = float('-inf')
+        for afterstate in bitboard.afterstates(board):
+            if afterstate.legal:
+                value = afterstate.score + self.network.evaluate(afterstate.board)
+                if value > best_value:
+                    best, best_value = afterstate, value
+        if best is None:
+            return None
+        self.afterstates.append(best.board)
+        self.rewards.append(best.score)
+        return best.move
+
+
+def checkpoint_info_path(checkpoint):
+    return checkpoint + ".json"
+
+
+def save_checkpoint(network, checkpoint, info):
+    # write next to the checkpoint and rename over it: workers that still map
+    # the old file keep reading the old weights instead of a half-written one
+    tmp = checkpoint + ".tmp.npy"
+    np.save(tmp, network.weights)
+    os.replace(tmp, checkpoint)
+    with open(checkpoint_info_path(checkpoint), "w") as f:
+        json.dump(info, f)
+
+
+def load_checkpoint(checkpoint):
+    """Return (network with writable in-memory weights, info) from checkpoint."""
+    network = NTupleNetwork(weights=np.load(checkpoint))
+    info_path = checkpoint_info_path(checkpoint)
+    info = {"games": 0, "batches": 0}
+    if os.path.exists(info_path):
+        with open(info_path) as f:
+            info = json.load(f)
+    return network, info
+
+
+def _play_chunk(game_ids, checkpoint, seed):
+    player = AfterstatePlayer(NTupleNetwork.load(checkpoint))
+    results = []
+    for game_id in game_ids:
+        player.new_game()
+        result = simulate_game(game_id, ai=player, seed=game_seed(seed, game_id))
+        result["score"] = sum(player.rewards)
+        result["afterstates"] = np.array(player.afterstates, dtype=np.uint64)
+        result["rewards"] = np.array(player.rewards, dtype=np.float64)
+        results.append(result)
+    return results
+
+
+def td_update(network, games, alpha):
+    """
+    One batched TD(0) step over games, a list of (afterstates, rewards) arrays.
+    Returns the mean absolute TD error.
+    """
+    games = [(a, r) for a, r in games if len(a)]
+    if not games:
+        return 0.0
+    afterstates = np.concatenate([a for a, _ in games])
+    values = network.evaluate_many(afterstates)
+
+    # reward and value of the afterstate that follows each one, 0 past a game's end
+    next_rewards = np.zeros(len(afterstates))
+    next_values = np.zeros(len(afterstates))
+    start = 0
+    for game_afterstates, game_rewards in games:
+        end = start + len(game_afterstates)
+        next_rewards[start:end - 1] = game_rewards[1:]
+        next_values[start:end - 1] = values[start + 1:end]
+        start = end
+    deltas = next_rewards + next_values - values
+
+    # every weight moves by the mean error of the afterstates that use it,
+    # shared across the tuples; summing instead would let the common weights
+    # (empty rows, small tiles) take thousands of steps at once
+    indices = network.indices_many(afterstates)
+    size = network.weights.shape[1]
+    step = alpha / len(network.weights)
+    for table, index in zip(network.weights, indices):
+        counts = np.bincount(index, minlength=size)
+        sums = np.bincount(index, weights=deltas, minlength=size)
+        table += (step * sums / np.maximum(counts, 1)).astype(np.float32)
+    return float(np.abs(deltas).mean())
+
+
+def train(num_games, batch_games=64, num_workers=4, alpha=DEFAULT_ALPHA,
+          checkpoint=DEFAULT_CHECKPOINT, seed=0, resume=False, on_batch=None):
+    """
+    Train for num_games self-play games, batch_games per update, and return
+    a summary. on_batch, if given, gets every batch report as it finishes.
+    """
+    if resume and os.path.exists(checkpoint):
+        network, info = load_checkpoint(checkpoint)
+    else:
+        network, info = NTupleNetwork(), {"games": 0, "batches": 0}
+    info["alpha"] = alpha
+    save_checkpoint(network, checkpoint, info)
+
+    max_tiles = Counter()
+    played = 0
+    moves = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        while played < num_games:
+            batch_start = time.perf_counter()
+            first = info["games"] + 1
+            game_ids = list(range(first, first + min(batch_games, num_games - played)))
+            chunk_size = max(1, -(-len(game_ids) // num_workers))
+            futures = [
+                executor.submit(_play_chunk, game_ids[i:i + chunk_size], checkpoint, seed)
+                for i in range(0, len(game_ids), chunk_size)
+            ]
+            results = [result for future in futures for result in future.result()]
+
+            td_error = td_update(
+                network, [(r["afterstates"], r["rewards"]) for r in results], alpha
+            )
+            info["games"] += len(results)
+            info["batches"] += 1
+            save_checkpoint(network, checkpoint, info)
+
+            batch_moves = sum(r["moves"] for r in results)
+            batch_max_tiles = Counter(r["max_tile"] for r in results)
+            played += len(results)
+            moves += batch_moves
+            max_tiles.update(batch_max_tiles)
+            elapsed = time.perf_counter() - batch_start
+            report = {
+                "batch": info["batches"],
+                "games": info["games"],
+                "mean_score": sum(r["score"] for r in results) / len(results),
+                "td_error": td_error,
+                "games_per_second": len(results) / elapsed,
+                "moves_per_second": batch_moves / elapsed,
+                "max_tile_counts": dict(sorted(batch_max_tiles.items())),
+            }
+            if on_batch:
+                on_batch(report)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "games": played,
+        "moves": moves,
+        "seconds": elapsed,
+        "games_per_second": played / elapsed if elapsed else 0.0,
+        "moves_per_second": moves / elapsed if elapsed else 0.0,
+        "max_tile_counts": dict(sorted(max_tiles.items())),
+        "checkpoint": checkpoint,
+    }
+
+
+def print_batch(report):
+    print(f"batch {report['batch']:>5}  games {report['games']:>7}  "
+          f"score {report['mean_score']:>9.0f}  td error {report['td_error']:>8.1f}  "
+          f"{report['games_per_second']:.1f} games/s  {report['moves_per_second']:.0f} moves/s  "
+          f"max tiles {report['max_tile_counts']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train n-tuple network weights by self-play TD(0).")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--batch", type=int, default=64, help="games per weight update")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--alpha", type=float, default=DEFAULT_ALPHA)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    args = parser.parse_args(argv)
+
+    summary = train(args.games, args.batch, args.workers, args.alpha,
+                    args.checkpoint, args.seed, args.resume, on_batch=print_batch)
+    print("\n--- Training Results ---")
+    print(f"Games: {summary['games']} in {summary['seconds']:.1f}s "
+          f"({summary['games_per_second']:.2f} games/s, {summary['moves_per_second']:.0f} moves/s)")
+    print("\n--- Max Tile Occurrences ---")
+    for tile, count in summary["max_tile_counts"].items():
+        print(f"Tile {tile}: {count} occurrences")
+    print(f"\nWeights saved to {summary['checkpoint']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Bitboard engine against the original list-of-lists game.
+
+Moves, spawns and game states on random boards must match the list
+implementation (benchmark.py keeps the original moves as the --legacy
+baseline, logic.game_state is still the list version), so changes to the
+row tables, their cache or the bit tricks cannot silently change the game.
+
+    $ python3 -m pytest -q test_bitboard.py
+"""
+import random
+
+import bitboard
+import logic
+import line_moves
+import replay
+import symmetry
+from benchmark import LEGACY_MOVES
+
+BOARDS = 500
+
+
+def random_matrices(seed=0, count=BOARDS):
+    # mixes sparse, crowded and full boards over few tile values, so merges,
+    # blocked moves and lost positions all come up
+    rng = random.Random(seed)
+    matrices = []
+    for _ in range(count):
+        empty = rng.choice((0.0, 0.1, 0.3, 0.6))
+        largest = rng.choice((3, 6, 11))
+        matrices.append([
+            [0 if rng.random() < empty else 1 << rng.randint(1, largest) for _ in range(4)]
+            for _ in range(4)
+        ])
+    return matrices
+
+
+def test_tables_match_a_fresh_build():
+    left, score, info = bitboard._build_row_tables()
+    assert bitboard.ROW_LEFT_TABLE == left
+    assert bitboard.ROW_SCORE_TABLE == score
+    assert bitboard.ROW_INFO_TABLE == info
+
+
+def test_moves_match_lists():
+    for mat in random_matrices():
+        board = bitboard.from_matrix(mat)
+        assert bitboard.to_matrix(board) == mat
+        for name, list_move in LEGACY_MOVES:
+            expected, done = list_move([row[:] for row in mat])
+            moved = bitboard.MOVE_FUNCS[name](board)
+            assert bitboard.to_matrix(moved) == expected, (mat, name)
+            assert (moved != board) == done, (mat, name)
+            assert logic.MOVES[name]([row[:] for row in mat]) == (expected, done)
+
+
+def test_afterstates_match_moves():
+    for mat in random_matrices(1):
+        board = bitboard.from_matrix(mat)
+        afterstates = bitboard.afterstates(board)
+        assert [a.move for a in afterstates] == [name for name, _ in bitboard.MOVES]
+        for afterstate in afterstates:
+            moved = bitboard.MOVE_FUNCS[afterstate.move](board)
+            assert afterstate.board == moved
+            assert afterstate.legal == (moved != board)
+            # line_moves scores merges on its own tables
+            _, _, score = line_moves.move_matrix_scored(mat, afterstate.move)
+            assert afterstate.score == score, (mat, afterstate.move)
+        assert bitboard.legal_moves(board) == [
+            (a.move, a.board) for a in afterstates if a.legal
+        ]
+
+
+def test_game_state_and_cells_match_lists():
+    for mat in random_matrices(2):
+        board = bitboard.from_matrix(mat)
+        state = logic.game_state(mat)
+        assert bitboard.game_state(board) == state, mat
+        assert bitboard.Board(board).game_state() == state, mat
+        empty = [4 * i + j for i in range(4) for j in range(4) if mat[i][j] == 0]
+        assert bitboard.empty_positions(board) == empty
+        assert bitboard.count_empty(board) == len(empty)
+        assert bitboard.transpose(board) == bitboard.from_matrix(
+            [list(column) for column in zip(*mat)]
+        )
+
+
+def test_board_tracks_its_state_through_moves_and_spawns():
+    rng = random.Random(3)
+    for mat in random_matrices(3, 100):
+        game = bitboard.Board.from_matrix(mat)
+        for _ in range(20):
+            moved, done = game.move(rng.choice(list(bitboard.MOVE_FUNCS)))
+            if done:
+                moved = moved.add_random_tile(rng)
+            fresh = bitboard.Board(moved.bits)
+            assert (moved.max_exponent, moved.empty, moved.can_merge) == (
+                fresh.max_exponent, fresh.empty, fresh.can_merge
+            )
+            game = moved
+
+
+def test_spawns_and_replay_codes():
+    rng = random.Random(4)
+    for mat in random_matrices(4):
+        board = bitboard.from_matrix(mat)
+        if not bitboard.empty_mask(board):
+            assert bitboard.add_random_tile(board, rng) == board
+            continue
+        spawned = bitboard.add_random_tile(board, rng)
+        added = spawned ^ board
+        cell = (added.bit_length() - 1) // 4
+        assert cell in bitboard.empty_positions(board)
+        assert added >> (4 * cell) in (1, 2)
+        assert replay.apply_spawn(board, replay.spawn_code(board, spawned)) == spawned
+
+
+def test_symmetries_carry_moves():
+    for mat in random_matrices(5, 200):
+        board = bitboard.from_matrix(mat)
+        images = symmetry.transforms(board)
+        assert len(set(map(symmetry.canonical, images))) == 1
+        for t, image in enumerate(images):
+            for name, move in bitboard.MOVES:
+                mapped = symmetry.MOVE_MAPS[t][name]
+                assert bitboard.MOVE_FUNCS[mapped](image) == symmetry.transforms(move(board))[t]
+                assert symmetry.INVERSE_MOVE_MAPS[t][mapped] == name
@@ -0,0 +1,51 @@
+"""
+Table-driven heuristic against GameAI's list-of-lists heuristic.
+
+HeuristicEvaluator.evaluate, evaluate_many and GameAI.evaluate_matrix (the
+original heuristic, still used for boards that are not 4x4) must score
+random 4x4 boards the same, so the cached row tables cannot drift from it.
+
+    $ python3 -m pytest -q test_heuristics.py
+"""
+import random
+
+import pytest
+
+import bitboard
+import heuristics
+from ai_logic import GameAI
+
+BOARDS = 2000
+
+
+def random_matrices(seed=0, count=BOARDS):
+    rng = random.Random(seed)
+    matrices = []
+    for _ in range(count):
+        empty = rng.choice((0.0, 0.2, 0.5, 0.8))
+        largest = rng.choice((4, 11, 15))
+        matrices.append([
+            [0 if rng.random() < empty else 1 << rng.randint(1, largest) for _ in range(4)]
+            for _ in range(4)
+        ])
+    return matrices
+
+
+def test_evaluator_matches_list_heuristic():
+    ai = GameAI()
+    evaluator = heuristics.HeuristicEvaluator()
+    matrices = random_matrices()
+    boards = [bitboard.from_matrix(mat) for mat in matrices]
+    many = evaluator.evaluate_many(boards)
+    for mat, board, batched in zip(matrices, boards, many):
+        expected = ai.evaluate_matrix(mat)
+        assert evaluator.evaluate(board) == pytest.approx(expected), mat
+        assert batched == pytest.approx(expected), mat
+        assert ai.evaluate_board(mat) == pytest.approx(expected), mat
+
+
+def test_tables_match_a_fresh_build():
+    features = heuristics.row_features()
+    built = heuristics._build_row_features()
+    for name, table in zip(("total", "empty", "smoothness", "monotonicity"), built):
+        assert features[name] == table, name
@@ -0,0 +1,94 @@
+"""
+Moves and game states on boards other than 4x4 against the original
+list-of-lists game.
+
+logic's moves send these boards through the per-length line tables in
+line_moves.py, so they must match the original moves (benchmark.py keeps
+them as LEGACY_MOVES) on square and rectangular boards alike.
+
+    $ python3 -m pytest -q test_line_moves.py
+"""
+import random
+
+import pytest
+
+import bitboard
+import line_moves
+import logic
+from benchmark import LEGACY_MOVES
+
+SHAPES = [(3, 3), (5, 5), (6, 6), (3, 5), (2, 2)]
+BOARDS = 300
+
+
+def random_matrices(rows, cols, seed=0, count=BOARDS):
+    # few tile values and some full boards, so merges, blocked moves and
+    # lost positions all come up
+    rng = random.Random(seed)
+    matrices = []
+    for _ in range(count):
+        empty = rng.choice((0.0, 0.0, 0.2, 0.5))
+        largest = rng.choice((2, 4, 11))
+        matrices.append([
+            [0 if rng.random() < empty else 1 << rng.randint(1, largest) for _ in range(cols)]
+            for _ in range(rows)
+        ])
+    return matrices
+
+
+def merge_score(line):
+    # sum of the tiles a move towards index 0 creates
+    exponents = [value.bit_length() - 1 if value else 0 for value in line]
+    return bitboard._slide_left(exponents)[1]
+
+
+def expected_game_state(mat):
+    cells = [value for row in mat for value in row]
+    if 2048 in cells:
+        return 'win'
+    if 0 in cells:
+        return 'not over'
+    rows, cols = len(mat), len(mat[0])
+    for i in range(rows):
+        for j in range(cols):
+            if j + 1 < cols and mat[i][j] == mat[i][j + 1]:
+                return 'not over'
+            if i + 1 < rows and mat[i][j] == mat[i + 1][j]:
+                return 'not over'
+    return 'lose'
+
+
+@pytest.mark.parametrize("rows, cols", SHAPES)
+def test_moves_match_lists(rows, cols):
+    for mat in random_matrices(rows, cols):
+        for name, list_move in LEGACY_MOVES:
+            expected, done = list_move([row[:] for row in mat])
+            assert logic.MOVES[name]([row[:] for row in mat]) == (expected, done), (mat, name)
+            new, moved, score = line_moves.move_matrix_scored(mat, name)
+            assert (new, moved) == (expected, done), (mat, name)
+            assert line_moves.move_matrix(mat, name) == (expected, done), (mat, name)
+
+            vertical = name in ('up', 'down')
+            lines = [list(line) for line in zip(*mat)] if vertical else mat
+            if name in ('right', 'down'):
+                lines = [line[::-1] for line in lines]
+            assert score == sum(merge_score(line) for line in lines), (mat, name)
+
+
+@pytest.mark.parametrize("rows, cols", SHAPES)
+def test_game_state_matches_neighbours(rows, cols):
+    for mat in random_matrices(rows, cols, seed=1):
+        assert logic.game_state(mat) == expected_game_state(mat), mat
+
+
+def test_game_state_checks_the_last_row_and_column():
+    # full 3x5 boards whose only merge is on the last row or the last column
+    last_row = [[2, 4, 8, 16, 32], [4, 8, 16, 32, 64], [8, 16, 32, 128, 128]]
+    last_column = [[2, 4, 8, 16, 32], [4, 8, 16, 32, 32], [8, 16, 32, 64, 128]]
+    blocked = [[2, 4, 8, 16, 32], [4, 8, 16, 32, 64], [8, 16, 32, 64, 128]]
+    assert logic.game_state(last_row) == 'not over'
+    assert logic.game_state(last_column) == 'not over'
+    assert logic.game_state(blocked) == 'lose'
+    assert logic.game_state([list(column) for column in zip(*last_row)]) == 'not over'
+    assert logic.game_state([list(column) for column in zip(*last_column)]) == 'not over'
+    assert logic.game_state([list(column) for column in zip(*blocked)]) == 'lose'
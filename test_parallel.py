@@ -1,48 +1,75 @@
+import random
 import logic
 import constants as c
+import bitboard
 from ai_logic import GameAI
+from search_stats import SearchStats
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from collections import Counter
 
-def simulate_game(game_id):
+def simulate_game(game_id, ai=None, seed=None, collect_stats=False, replay=None,
+                  deterministic=False):
     """
     Simulates a single game instance and returns detailed results.
+    Pass an existing GameAI to reuse it across games, its caches stay warm
+    from game to game unless deterministic is set, which calls its
+    new_game() first so a seeded game plays the same whichever games the
+    AI played before. Pass a seed to replay the exact same spawn sequence.
+    With collect_stats the result also holds the game's search statistics
+    under "search_stats". Every step is streamed to replay (a
+    replay.ReplayWriter) if given.
     """
-    ai = GameAI()
-    game = logic.new_game(c.GRID_LEN)
+    if ai is None:
+        ai = GameAI()
+    if deterministic:
+        ai.new_game()
+    if collect_stats:
+        previous_stats = ai.stats
+        ai.stats = SearchStats()
+    # the game's spawns and the AI's sampled spawns come from separate streams,
+    # so a seed deals the same tiles whichever AI plays it
+    rng = random.Random(seed)
+    search_rng = random.Random(None if seed is None else f"search-{seed}")
+    # immutable bitboard, moves return a new board instead of copying lists
+    game = bitboard.Board.from_matrix(logic.new_game(c.GRID_LEN, rng))
     moves = 0
     max_tile = 0
 
-    while logic.game_state(game) == "not over":
-        best_move = ai.get_best_move(game)
+    while game.game_state() == "not over":
+        best_move = ai.get_best_move(game, search_rng)
         if best_move:
             # Execute the move
-            if best_move == 'up':
-                game, done = logic.up(game)
-            elif best_move == 'down':
-                game, done = logic.down(game)
-            elif best_move == 'left':
-                game, done = logic.left(game)
-            elif best_move == 'right':
-                game, done = logic.right(game)
+            moved, done = game.move(best_move)
             if done:
-                game = logic.add_random_tile(game)
+                spawned = moved.add_random_tile(rng)
+                if replay is not None:
+                    replay.write_step(game.bits, best_move, moved.bits, spawned.bits)
+                game = spawned
                 moves += 1  # Increment move count
+            else:
+                game = moved
 
         # Update max tile
-        max_tile = max(max_tile, max(max(row) for row in game))
+        max_tile = max(max_tile, game.max_tile())
+
+    if replay is not None:
+        replay.end_game(game.bits)
 
     # Collect game result
     result = {
         "game_id": game_id,
-        "result": logic.game_state(game),  # "win" or "lose"
+        "seed": seed,
+        "result": game.game_state(),  # "win" or "lose"
         "moves": moves,
         "max_tile": max_tile
     }
+    if collect_stats:
+        result["search_stats"] = ai.stats.to_dict()
+        ai.stats = previous_stats
     return result
 
 
-def run_simulations_concurrently(num_games, num_workers=4):
+def run_simulations_concurrently(num_games, num_workers=4, collect_stats=False):
     """
     Runs multiple game simulations concurrently and provides a summary of results.
     """
@@ -50,7 +77,7 @@ def run_simulations_concurrently(num_games, num_workers=4):
     with ProcessPoolExecutor(max_workers=num_workers) as executor:
         # Submit all tasks
         future_to_game = {
-            executor.submit(simulate_game, game_id): game_id
+            executor.submit(simulate_game, game_id, collect_stats=collect_stats): game_id
             for game_id in range(1, num_games + 1)
         }
 
@@ -83,6 +110,14 @@ def run_simulations_concurrently(num_games, num_workers=4):
     for tile, count in sorted_max_tile_counts:
         print(f"Tile {tile}: {count} occurrences")
 
+    if collect_stats:
+        # Aggregate search statistics over every game
+        search_stats = SearchStats()
+        for r in results:
+            search_stats.merge(SearchStats.from_dict(r["search_stats"]))
+        print("\n--- Search Statistics ---")
+        print(search_stats.report())
+
 if __name__ == "__main__":
     num_games = 100  # Number of simulations to run
     num_workers = 25  # Number of parallel workers
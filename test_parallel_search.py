@@ -0,0 +1,32 @@
+"""
+Parallel root search against the serial search.
+
+With the same seed a GameAI with parallel_workers must pick the same move
+as a serial one on every benchmark position, for both algorithms; the
+transposition table is off so neither side reuses earlier results.
+
+    $ python3 -m pytest -q test_parallel_search.py
+"""
+import random
+
+import pytest
+
+import parallel_search
+from ai_logic import GameAI
+from benchmark import all_positions
+
+SEEDS = 3
+
+
+def teardown_module():
+    parallel_search.shutdown_pool()
+
+
+@pytest.mark.parametrize("algorithm", ["minimax", "expectimax"])
+def test_parallel_matches_serial(algorithm):
+    serial = GameAI(algorithm=algorithm, tt_size=0)
+    parallel = GameAI(algorithm=algorithm, tt_size=0, parallel_workers=2)
+    for mat in all_positions():
+        for seed in range(SEEDS):
+            expected = serial.get_best_move(mat, random.Random(seed))
+            assert parallel.get_best_move(mat, random.Random(seed)) == expected, (mat, seed)
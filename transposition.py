@@ -0,0 +1,109 @@
+"""
+Bounded transposition table for the AI search.
+
+Entries map a bitboard (see bitboard.py) to the score it got when searched
+with a given remaining depth. A stored score is reused for any lookup that
+asks for the same or a shallower depth.
+
+Two replacement policies are available:
+
+* 'depth' - a fixed number of slots addressed by a hash of the board. On a
+  collision the deeper result wins, except that entries left over from an
+  older get_best_move call (an older generation) are always replaced.
+* 'lru'   - an ordered dict capped at max_entries that evicts the least
+  recently used board.
+"""
+from collections import OrderedDict
+
+REPLACEMENT_POLICIES = ('depth', 'lru')
+
+
+class TranspositionTable:
+    def __init__(self, max_entries=2 ** 18, policy='depth'):
+        if policy not in REPLACEMENT_POLICIES:
+            raise ValueError(f"unknown replacement policy: {policy!r}")
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.policy = policy
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.clear()
+
+    def clear(self):
+        if self.policy == 'depth':
+            self._keys = [None] * self.max_entries
+            self._depths = [0] * self.max_entries
+            self._values = [0.0] * self.max_entries
+            self._generations = [0] * self.max_entries
+            self._size = 0
+        else:
+            self._entries = OrderedDict()
+
+    def new_search(self):
+        # called once per get_best_move so stale entries lose their depth priority
+        self.generation += 1
+
+    def _slot(self, board):
+        # Fibonacci hashing spreads the nibble-packed boards across the slots
+        return (((board * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> 16) % self.max_entries
+
+    def get(self, board, depth):
+        if self.policy == 'depth':
+            slot = self._slot(board)
+            if self._keys[slot] == board and self._depths[slot] >= depth:
+                self.hits += 1
+                return self._values[slot]
+        else:
+            entry = self._entries.get(board)
+            if entry is not None and entry[0] >= depth:
+                self._entries.move_to_end(board)
+                self.hits += 1
+                return entry[1]
+        self.misses += 1
+        return None
+
+    def put(self, board, depth, value):
+        if self.policy == 'depth':
+            slot = self._slot(board)
+            stored = self._keys[slot]
+            if stored is None:
+                self._size += 1
+            elif stored != board:
+                if self._generations[slot] == self.generation and self._depths[slot] > depth:
+                    return
+                self.evictions += 1
+            elif self._depths[slot] > depth:
+                return
+            self._keys[slot] = board
+            self._depths[slot] = depth
+            self._values[slot] = value
+            self._generations[slot] = self.generation
+        else:
+            entry = self._entries.get(board)
+            if entry is not None and entry[0] > depth:
+                self._entries.move_to_end(board)
+                return
+            self._entries[board] = (depth, value)
+            self._entries.move_to_end(board)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        if self.policy == 'depth':
+            return self._size
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }